@@ -18,10 +18,16 @@ DEFAULT_METAFACT_VALIDATOR = r"(.|\n)*"
 ACT_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
 from act.api import utils
+from act.api import codec
+from act.api import transport
+from act.api import stream
+from act.api import search
+from act.api import columnar
 from act.api import schema
 from act.api import base
 from act.api import obj
 from act.api import fact
 from act.api import helpers
+from act.api import aio
 
 from .helpers import Act
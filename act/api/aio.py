@@ -0,0 +1,421 @@
+"""asyncio client for the ACT API
+
+Requests are sent with httpx (pip3 install act-api[aio]) from the event
+loop, without threads. The operations are the same request plans as used by
+act.api.Act (see act.api.base.request_plan), so results are the same Schema
+objects (Fact, Object, etc)."""
+
+import asyncio
+import gzip
+import os
+import ssl
+from logging import info, warning
+
+import requests.auth
+
+from .base import (ArgumentError, CircuitOpen, ResponseError, ServiceTimeout,
+                   decode_response, plan, record_error)
+from .fact import Fact, FactType
+from .helpers import Act
+from .obj import Object, ObjectType
+from .schema import schema_doc
+
+# requests_common_kwargs supported by AsyncAct
+REQUESTS_KWARGS = ("headers", "timeout", "verify", "cert", "auth", "proxies")
+
+
+def httpx_auth(httpx, auth):
+    """Return httpx auth for requests auth argument"""
+
+    if auth is None or isinstance(auth, (tuple, httpx.Auth)):
+        return auth
+
+    if isinstance(auth, requests.auth.HTTPProxyAuth):
+        raise ArgumentError("HTTPProxyAuth is not supported by AsyncAct")
+
+    if isinstance(auth, requests.auth.HTTPBasicAuth):
+        return httpx.BasicAuth(auth.username, auth.password)
+
+    if isinstance(auth, requests.auth.HTTPDigestAuth):
+        return httpx.DigestAuth(auth.username, auth.password)
+
+    raise ArgumentError("auth is not supported by AsyncAct: {!r}".format(auth))
+
+
+def ssl_context(httpx, verify, cert):
+    """Return httpx verify argument for requests verify (bool or path to CA
+    bundle/directory) and cert (path to client certificate, or tuple with
+    paths to certificate and key) arguments"""
+
+    if isinstance(verify, str):
+        if os.path.isdir(verify):
+            context = ssl.create_default_context(capath=verify)
+        else:
+            context = ssl.create_default_context(cafile=verify)
+    elif cert:
+        context = httpx.create_ssl_context(verify=verify)
+    else:
+        return verify
+
+    if isinstance(cert, str):
+        context.load_cert_chain(cert)
+    elif cert:
+        context.load_cert_chain(*cert)
+
+    return context
+
+
+class AsyncAct(object):
+    """asyncio client with the same operations as act.api.Act
+
+    All requests share one httpx connection pool, and an asyncio.Semaphore
+    makes sure that at most `concurrency` requests are in flight at the same
+    time. Retry policy, rate limiter, circuit breaker, response cache, codec
+    and compression from the config are used as in act.api.Act (single
+    flight is not supported). headers, timeout, verify, cert, auth and proxies
+    are used from requests_common_kwargs, and ArgumentError is raised for
+    other requests arguments.
+
+    All other arguments are passed to act.api.Act."""
+
+    def __init__(self, act_baseurl, user_id, concurrency=10, transport=None, **kwargs):
+        """
+        Args:
+            concurrency (int):  Maximum number of requests in flight
+            transport:          httpx transport (default=HTTP connection pool
+                                with `concurrency` connections)
+        """
+        import httpx  # pylint: disable=import-outside-toplevel
+
+        self._httpx = httpx
+
+        self.act = Act(act_baseurl, user_id, **kwargs)
+        self.concurrency = concurrency
+
+        common = self.config.requests_common_kwargs or {}
+
+        unsupported = set(common) - set(REQUESTS_KWARGS)
+        if unsupported:
+            raise ArgumentError(
+                "requests_common_kwargs not supported by AsyncAct: {}".format(
+                    ", ".join(sorted(unsupported))
+                )
+            )
+
+        timeout = common.get("timeout")
+        if isinstance(timeout, (list, tuple)):
+            # requests uses (connect, read) tuples
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+
+        limits = httpx.Limits(
+            max_connections=concurrency,
+            max_keepalive_connections=concurrency if self.config.keep_alive else 0,
+        )
+        verify = ssl_context(httpx, common.get("verify", True), common.get("cert"))
+
+        # requests uses {"https": "http://proxy:3128"}, httpx mounts a
+        # transport for each URL pattern ("https://")
+        mounts = {
+            (scheme if "://" in scheme else scheme + "://"): httpx.AsyncHTTPTransport(
+                proxy=proxy, verify=verify, limits=limits
+            )
+            for scheme, proxy in (common.get("proxies") or {}).items()
+            if proxy
+        }
+
+        self.client = httpx.AsyncClient(
+            auth=httpx_auth(httpx, common.get("auth")),
+            limits=limits,
+            timeout=timeout,
+            verify=verify,
+            mounts=mounts or None,
+            transport=transport,
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    @property
+    def config(self):
+        return self.act.config
+
+    async def api_request(self, method, uri, json=None, params=None):
+        """Send request to API and return the decoded response. Cached
+        responses are returned without sending the request"""
+
+        url = "{}/{}".format(self.config.act_baseurl, uri)
+        cache = self.config.response_cache
+
+        if cache is None or not cache.cacheable(method, url):
+            return await self._request(method, url, json, params)
+
+        key = cache.key(method, url, self.config.user_id, params, json)
+        response = cache.get(key, self.config.codec)
+
+        if response is None:
+            response = await self._request(method, url, json, params)
+            cache.put(key, response, self.config.codec)
+
+        return response
+
+    async def _request(self, method, url, json, params):
+        config = self.config
+        common = config.requests_common_kwargs or {}
+
+        headers = dict(common.get("headers") or {})
+
+        if config.user_id:
+            headers["ACT-User-ID"] = str(config.user_id)
+
+        content = None
+        if json is not None:
+            content = config.codec.encode(json)
+            headers["Content-Type"] = "application/json"
+
+            if (
+                config.compress_threshold is not None
+                and len(content) >= config.compress_threshold
+            ):
+                content = gzip.compress(content, compresslevel=6)
+                headers["Content-Encoding"] = "gzip"
+
+        # Arguments included in error messages
+        kwargs = {"json": json, "params": params}
+
+        # Connection errors that are retried (like requests ConnectionError)
+        connection_errors = (
+            self._httpx.NetworkError,
+            self._httpx.ConnectTimeout,
+            self._httpx.RemoteProtocolError,
+        )
+
+        retry_policy = config.retry_policy
+        circuit_breaker = config.circuit_breaker
+
+        retries = 0
+        sleep_time = 0.0
+
+        try:
+            while True:
+                if circuit_breaker and not circuit_breaker.allow():
+                    raise CircuitOpen(
+                        "Circuit breaker is open, request not sent: url={}".format(url)
+                    )
+
+                if config.rate_limiter:
+                    wait = config.rate_limiter.reserve(url)
+                    if wait:
+                        await asyncio.sleep(wait)
+
+                if retry_policy:
+                    retry_policy.request_sent()
+
+                try:
+                    async with self._semaphore:
+                        res = await self.client.request(
+                            method, url, content=content, params=params, headers=headers
+                        )
+
+                    response = decode_response(res, url, kwargs, config.codec)
+                except connection_errors + (ServiceTimeout,) as err:
+                    if circuit_breaker:
+                        circuit_breaker.record_failure()
+
+                    if not (retry_policy and retry_policy.acquire(retries)):
+                        if isinstance(err, connection_errors):
+                            raise ResponseError("Connection error {}".format(err))
+                        raise
+
+                    delay = retry_policy.backoff(retries)
+                    warning(
+                        "Request failed, retry %d in %.2fs: url=%s, error=%s",
+                        retries + 1,
+                        delay,
+                        url,
+                        err,
+                    )
+                    await asyncio.sleep(delay)
+
+                    retries += 1
+                    sleep_time += delay
+                    continue
+                except Exception as err:
+                    if circuit_breaker:
+                        record_error(
+                            circuit_breaker, err, isinstance(err, self._httpx.HTTPError)
+                        )
+                    raise
+
+                if circuit_breaker:
+                    circuit_breaker.record_success()
+
+                return response
+        finally:
+            if retry_policy:
+                retry_policy.report(retries, sleep_time)
+
+                if retries:
+                    info(
+                        "Request to %s used %d retries (%.2fs sleeping)",
+                        url,
+                        retries,
+                        sleep_time,
+                    )
+
+    async def api_send(self, req):
+        """Send act.api.base.Request to API and return the response"""
+
+        if req.stream:
+            raise ArgumentError("Streaming is not supported by AsyncAct")
+
+        if req.method in ("POST", "PUT"):
+            return await self.api_request(req.method, req.uri, json=req.json or {})
+
+        return await self.api_request(req.method, req.uri, params=req.params)
+
+    async def run(self, request_plan):
+        """Run request plan (see act.api.base.request_plan) and return the
+        result"""
+
+        try:
+            req = next(request_plan)
+
+            while True:
+                req = request_plan.send(await self.api_send(req))
+        except StopIteration as stop:
+            return stop.value
+
+    async def fact_search(self, *args, **kwargs):
+        """Search facts. Takes the same arguments as act.api.Act.fact_search(),
+        except stream.
+
+        Returns ActResultSet of Facts."""
+
+        return await self.run(plan(self.act.fact_search, *args, **kwargs))
+
+    async def object_search(self, *args, **kwargs):
+        """Search objects. Takes the same arguments as
+        act.api.Act.object_search(), except stream.
+
+        Returns ActResultSet of Objects."""
+
+        return await self.run(plan(self.act.object_search, *args, **kwargs))
+
+    @schema_doc(Fact.SCHEMA)
+    def fact(self, *args, **kwargs):
+        """Create fact (not sent to the platform before add() is awaited)"""
+
+        return self.act.fact(*args, **kwargs)
+
+    @schema_doc(Fact.SCHEMA)
+    def meta_fact(self, *args, **kwargs):
+        """Create meta fact (not sent to the platform before add() is awaited)"""
+
+        return self.act.meta_fact(*args, **kwargs)
+
+    @schema_doc(Object.SCHEMA)
+    def object(self, *args, **kwargs):
+        """Create object"""
+
+        return self.act.object(*args, **kwargs)
+
+    @schema_doc(FactType.SCHEMA)
+    def fact_type(self, *args, **kwargs):
+        """Create fact type (not sent to the platform before add() is awaited)"""
+
+        return self.act.fact_type(*args, **kwargs)
+
+    @schema_doc(ObjectType.SCHEMA)
+    def object_type(self, *args, **kwargs):
+        """Create object type (not sent to the platform before add() is awaited)"""
+
+        return self.act.object_type(*args, **kwargs)
+
+    def origin(self, *args, **kwargs):
+        """Create origin (not sent to the platform before add() is awaited)"""
+
+        return self.act.origin(*args, **kwargs)
+
+    async def add(self, item):
+        """Add Fact, MetaFact, FactType, ObjectType or Origin to the platform.
+
+        Returns the added item, updated with the result from the platform."""
+
+        return await self.run(plan(item.add))
+
+    async def get(self, item):
+        """Get Fact or Origin (by id) from the platform"""
+
+        return await self.run(plan(item.get))
+
+    async def traverse(self, obj, query=None):
+        """Traverse from object using a gremlin query"""
+
+        return await self.run(plan(obj.traverse, query))
+
+    async def object_facts(self, obj):
+        """Get facts bound to object"""
+
+        return await self.run(plan(obj.facts))
+
+    async def get_meta(self, fact, before=None, after=None, limit=None):
+        """Get meta facts for fact"""
+
+        return await self.run(plan(fact.get_meta, before, after, limit))
+
+    async def retract(self, fact, *args, **kwargs):
+        """Retract fact. Takes the same arguments as Fact.retract()"""
+
+        return await self.run(plan(fact.retract, *args, **kwargs))
+
+    async def get_fact_types(self):
+        """Get fact types"""
+
+        return await self.run(plan(self.act.get_fact_types))
+
+    async def get_object_types(self):
+        """Get object types"""
+
+        return await self.run(plan(self.act.get_object_types))
+
+    async def get_origins(self, include_deleted=False, limit=25):
+        """Get origins"""
+
+        return await self.run(plan(self.act.get_origins, include_deleted, limit))
+
+    async def create_fact_type(self, *args, **kwargs):
+        """Create fact type. Takes the same arguments as Act.create_fact_type()"""
+
+        return await self.run(plan(self.act.create_fact_type, *args, **kwargs))
+
+    async def create_fact_type_all_bindings(self, *args, **kwargs):
+        """Create fact type bound to all object types. Takes the same arguments
+        as Act.create_fact_type_all_bindings()"""
+
+        return await self.run(
+            plan(self.act.create_fact_type_all_bindings, *args, **kwargs)
+        )
+
+    async def create_meta_fact_type(self, *args, **kwargs):
+        """Create meta fact type. Takes the same arguments as
+        Act.create_meta_fact_type()"""
+
+        return await self.run(plan(self.act.create_meta_fact_type, *args, **kwargs))
+
+    async def create_meta_fact_type_all_bindings(self, *args, **kwargs):
+        """Create meta fact type bound to all fact types. Takes the same arguments
+        as Act.create_meta_fact_type_all_bindings()"""
+
+        return await self.run(
+            plan(self.act.create_meta_fact_type_all_bindings, *args, **kwargs)
+        )
+
+    async def close(self):
+        """Close connections to the API"""
+
+        await self.client.aclose()
+        self.act.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
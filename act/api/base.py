@@ -1,14 +1,22 @@
 import copy
-import json
+import functools
+import gzip
 import re
-from logging import error, info
-from typing import Any, Dict, Text
+import threading
+import time
+import weakref
+from logging import error, info, warning
+from typing import Any, Dict, NamedTuple, Optional, Text
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from . import DEFAULT_ACCESS_MODE
+from . import DEFAULT_ACCESS_MODE, columnar
+from .codec import DEFAULT_CODEC, get_codec
 from .re import UUID_MATCH
-from .schema import Field, MissingField, Schema, schema_doc
+from .schema import (Field, Interner, MissingField, Schema, interning,
+                     lazy_deserialization, schema_doc)
+from .stream import ARRAY_START, ITEM, iter_json_object
 
 
 class NotImplemented(Exception):
@@ -27,10 +35,18 @@ class ValidationError(Exception):
     ...
 
 
+class ServerError(ResponseError):
+    """Error response (5xx) from the API or a proxy in front of it"""
+
+
 class ServiceTimeout(Exception):
     ...
 
 
+class CircuitOpen(Exception):
+    ...
+
+
 ERROR_HANDLER = {
     # Mapping of message templates provided in 412 errors from backend to
     # Exceptions that will be raised
@@ -55,16 +71,85 @@ def log_error_and_raise(
         f"status_code={res.status_code}, response={res.text}"
     )
     error(error_message)
-    raise ResponseError(error_message)
 
+    if res.status_code >= 500:
+        err = ServerError(error_message)
+    else:
+        err = ResponseError(error_message)
 
-def request(method, user_id, url, requests_common_kwargs=None, **kwargs):
+    err.status_code = res.status_code
+    raise err
+
+
+def create_session(
+    pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True
+):
+    """Create a requests session with a connection pool
+
+    Args:
+        pool_connections (int):  Number of hosts to keep connection pools for
+        pool_maxsize (int):      Maximum number of connections kept per host
+        pool_block (bool):       Block when no free connections are available,
+                                 instead of opening a connection that is
+                                 discarded after use
+        keep_alive (bool):       Reuse connections between requests"""
+
+    session = requests.Session()
+
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+
+    return session
+
+
+def request(
+    method,
+    user_id,
+    url,
+    requests_common_kwargs=None,
+    session=None,
+    retry_policy=None,
+    rate_limiter=None,
+    circuit_breaker=None,
+    compress_threshold=None,
+    codec=None,
+    stream=False,
+    single_flight=None,
+    response_cache=None,
+    **kwargs,
+):
     """Perform requests towards API
 
     Args:
         method (str):         POST|GET
         user_id (int):        Act user ID
         url (str):            Absolute URL for the endpoint
+        session (Session):    requests session used to send the request. A new
+                              connection is opened for the request if not set
+        retry_policy (RetryPolicy): Retry requests that fail with ServiceTimeout
+                              or connection errors according to this policy
+        rate_limiter (RateLimiter): Wait for the rate limiter before each request
+                              (including retries) is sent
+        circuit_breaker (CircuitBreaker): Raise CircuitOpen without sending the
+                              request while the circuit is open
+        compress_threshold (int): Compress JSON bodies of this size (bytes) or
+                              larger with gzip. Compression is disabled if None
+        codec (JSONCodec):    Codec used to encode the json argument and decode
+                              the response (default=json from standard library)
+        stream (bool):        Return the requests.Response without reading the
+                              body, so it can be decoded incrementally
+        single_flight (SingleFlight): Identical GET requests in flight at the
+                              same time share one request and result
+        response_cache (ResponseCache): Return cached responses from read-only
+                              endpoints and cache new responses
         **kwargs (keywords):  Additional options passed to requests json parameter
                               the following fields:"""
 
@@ -76,23 +161,194 @@ def request(method, user_id, url, requests_common_kwargs=None, **kwargs):
     # Apply common request arguments
     requests_kwargs.update(kwargs)
 
-    # Make sure we have header as argument
-    if "headers" not in requests_kwargs:
-        requests_kwargs["headers"] = {}
+    # Copy headers, so we do not modify headers in requests_common_kwargs
+    requests_kwargs["headers"] = dict(requests_kwargs.get("headers") or {})
 
     # Add User ID as header
     if user_id:
         requests_kwargs["headers"]["ACT-User-ID"] = str(user_id)
 
+    if not codec:
+        codec = DEFAULT_CODEC
+
+    if response_cache and not stream and response_cache.cacheable(method, url):
+        return response_cache.fetch(
+            response_cache.key(
+                method, url, user_id, kwargs.get("params"), kwargs.get("json")
+            ),
+            functools.partial(
+                request,
+                method,
+                user_id,
+                url,
+                requests_common_kwargs,
+                session=session,
+                retry_policy=retry_policy,
+                rate_limiter=rate_limiter,
+                circuit_breaker=circuit_breaker,
+                compress_threshold=compress_threshold,
+                codec=codec,
+                single_flight=single_flight,
+                **kwargs,
+            ),
+            codec,
+        )
+
+    if single_flight and method.upper() == "GET" and not stream:
+        # GET requests are idempotent, so identical requests (including user
+        # and headers) can share the response
+        return single_flight.do(
+            (method.upper(), url, repr(sorted(requests_kwargs.items()))),
+            functools.partial(
+                request,
+                method,
+                user_id,
+                url,
+                requests_common_kwargs,
+                session=session,
+                retry_policy=retry_policy,
+                rate_limiter=rate_limiter,
+                circuit_breaker=circuit_breaker,
+                codec=codec,
+                **kwargs,
+            ),
+        )
+
+    if requests_kwargs.get("json") is not None and (
+        codec is not DEFAULT_CODEC or compress_threshold is not None
+    ):
+        encode_body(requests_kwargs, codec, compress_threshold)
+
+    retries = 0
+    sleep_time = 0.0
+
     try:
-        res = requests.request(method, url, **requests_kwargs)
-    except requests.exceptions.ConnectionError as e:
-        raise ResponseError("Connection error {}".format(e))
+        while True:
+            if circuit_breaker and not circuit_breaker.allow():
+                raise CircuitOpen(
+                    "Circuit breaker is open, request not sent: url={}".format(url)
+                )
+
+            if rate_limiter:
+                rate_limiter.acquire(url)
+
+            if retry_policy:
+                retry_policy.request_sent()
+
+            try:
+                response = send_request(
+                    session, method, url, requests_kwargs, kwargs, codec, stream
+                )
+            except (requests.exceptions.ConnectionError, ServiceTimeout) as err:
+                if circuit_breaker:
+                    circuit_breaker.record_failure()
+
+                # Validation errors (412) and other errors are never retried
+                if not (retry_policy and retry_policy.acquire(retries)):
+                    if isinstance(err, requests.exceptions.ConnectionError):
+                        raise ResponseError("Connection error {}".format(err))
+                    raise
+
+                delay = retry_policy.backoff(retries)
+                warning(
+                    "Request failed, retry %d in %.2fs: url=%s, error=%s",
+                    retries + 1,
+                    delay,
+                    url,
+                    err,
+                )
+                time.sleep(delay)
+
+                retries += 1
+                sleep_time += delay
+                continue
+            except Exception as err:
+                if circuit_breaker:
+                    record_error(
+                        circuit_breaker,
+                        err,
+                        isinstance(err, requests.exceptions.RequestException),
+                    )
+                raise
+
+            if circuit_breaker:
+                circuit_breaker.record_success()
+
+            return response
+    finally:
+        if retry_policy:
+            retry_policy.report(retries, sleep_time)
+
+            if retries:
+                info(
+                    "Request to %s used %d retries (%.2fs sleeping)",
+                    url,
+                    retries,
+                    sleep_time,
+                )
+
+
+def record_error(circuit_breaker, err, transport_error=False):
+    """Record request that failed with err in circuit_breaker. transport_error
+    is True for errors from the HTTP client (e.g. timeouts)"""
+
+    if transport_error or isinstance(err, ServerError):
+        # Timeouts and 5xx responses (e.g. from a proxy) are failures of a
+        # degraded backend
+        circuit_breaker.record_failure()
+    elif isinstance(err, ValidationError) or getattr(err, "status_code", None) == 412:
+        # Validation errors are answered by the backend
+        circuit_breaker.record_success()
+    else:
+        # Neither success nor failure (e.g. 404 or a body that can not be
+        # decoded)
+        circuit_breaker.release()
+
+
+def encode_body(requests_kwargs, codec, compress_threshold=None):
+    """Encode the json argument in requests_kwargs using codec. The body is
+    compressed with gzip if it is at least `compress_threshold` bytes"""
+
+    body = codec.encode(requests_kwargs.pop("json"))
+
+    if compress_threshold is not None and len(body) >= compress_threshold:
+        body = gzip.compress(body, compresslevel=6)
+        requests_kwargs["headers"]["Content-Encoding"] = "gzip"
+
+    requests_kwargs["data"] = body
+    requests_kwargs["headers"]["Content-Type"] = "application/json"
+
+
+def send_request(
+    session, method, url, requests_kwargs, kwargs, codec=DEFAULT_CODEC, stream=False
+):
+    """Send a single request and return the decoded response. Errors reported
+    by the API are raised as exceptions. If stream is True, the
+    requests.Response is returned with the body unread.
+
+    requests.exceptions.ConnectionError is not handled, so it can be retried
+    by the caller."""
+
+    if stream:
+        requests_kwargs = dict(requests_kwargs, stream=True)
+
+    res = (session or requests).request(method, url, **requests_kwargs)
+
+    if stream:
+        check_response(res, url, kwargs, codec)
+        return res
+
+    return decode_response(res, url, kwargs, codec)
+
+
+def check_response(res, url, kwargs, codec=DEFAULT_CODEC):
+    """Raise exception for error responses. res is a requests.Response (or
+    a response with the same status_code, content and text attributes)"""
 
     if res.status_code in (412, 503):
         try:
-            response = res.json()
-        except requests.exceptions.JSONDecodeError:
+            response = codec.loads(res.content)
+        except ValueError:
             log_error_and_raise("Unable to parse response as json", url, kwargs, res)
 
         if "messages" not in response:
@@ -124,19 +380,40 @@ def request(method, user_id, url, requests_common_kwargs=None, **kwargs):
     elif res.status_code not in (200, 201):
         log_error_and_raise("Unknown response", url, kwargs, res)
 
+
+def decode_response(res, url, kwargs, codec=DEFAULT_CODEC):
+    """Raise exception for error responses, or return the decoded response"""
+
+    check_response(res, url, kwargs, codec)
+
     try:
-        return res.json()
+        return codec.loads(res.content)
 
-    except json.decoder.JSONDecodeError:
+    except ValueError:
         raise ResponseError(
             "Error decoding response {}: {}".format(res.status_code, res.text)
         )
 
 
+# Placeholder for entries not deserialized yet in lazy result sets
+_PENDING = object()
+
+# Number of entries deserialized at a time when iterating lazy result sets
+ITER_CHUNK = 64
+
+
 class ActResultSet(object):
     """Represents a list of Act entries"""
 
-    def __init__(self, response, deserializer, config=None):
+    def __init__(
+        self,
+        response,
+        deserializer,
+        config=None,
+        lazy_fields=False,
+        lazy=False,
+        keep_entries=False,
+    ):
         """Initialize result set
         Args:
             response (str):       JSON response from Act. This should include
@@ -147,35 +424,157 @@ class ActResultSet(object):
                                     - size: the total number of entries in the platform
                                     - data (array): array of entries
 
-            deserializer (class): Deseralizer class"""
+            deserializer (class): Deseralizer class (or function)
+            lazy_fields (bool):   Deserialize nested fields (objects, types etc)
+                                  on first access
+            lazy (bool):          Deserialize entries on first access (indexing
+                                  or iteration) instead of up front
+            keep_entries (bool):  Keep the entries from the response (in
+                                  `entries`) for columnar export (to_records,
+                                  to_pandas, to_arrow). Implies lazy, so
+                                  entries are only deserialized if they are
+                                  accessed. Always kept if lazy"""
 
         if not isinstance(response["data"], list):
             raise ResponseError("Response should be list: {}".format(response["data"]))
 
-        self.data = [deserializer(**d).configure(config) for d in response["data"]]
+        # Entries from the response, for lazy deserialization and columnar
+        # export. Not kept by default, since they use more memory than the
+        # deserialized objects. Columnar export reads the entries, so they are
+        # not deserialized unless accessed
+        lazy = lazy or keep_entries
+
+        self.entries = response["data"] if lazy else None
+        self.deserializer = deserializer
+
+        self._config = config
+        self._lazy_fields = lazy_fields
+
+        # Calls (see __call__) to apply to entries that are not deserialized yet
+        self._calls = []
+
+        if lazy:
+            self._data = [_PENDING] * len(self.entries)
+        else:
+            self._data = self._deserialize(response["data"])
 
         self.size = response["size"]
         self.count = response["count"]
         self.limit = response["limit"]
         self.status_code = response["responseCode"]
 
+    def _deserialize(self, entries):
+        """Deserialize entries and apply calls"""
+
+        interner = self._config.interner if self._config else None
+
+        # Deserializers with deserialize_batch (e.g. ActBase classes) create
+        # all objects in one pass, with config attached as they are created
+        deserialize_batch = getattr(self.deserializer, "deserialize_batch", None)
+
+        with lazy_deserialization(self._lazy_fields), interning(interner):
+            if deserialize_batch:
+                items = deserialize_batch(entries, config=self._config)
+            else:
+                items = [
+                    self.deserializer(**d).configure(self._config) for d in entries
+                ]
+
+        for func, args, kwargs in self._calls:
+            items = [getattr(item, func)(*args, **kwargs) for item in items]
+
+        return items
+
+    def _materialize(self, indexes):
+        """Deserialize entries at indexes that are not deserialized yet"""
+
+        pending = [i for i in indexes if self._data[i] is _PENDING]
+
+        if pending:
+            items = self._deserialize([self.entries[i] for i in pending])
+
+            for i, item in zip(pending, items):
+                self._data[i] = item
+
+    @property
+    def data(self):
+        """List of all entries (deserializes all entries in lazy result sets)"""
+
+        self._materialize(range(len(self._data)))
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        self._data = list(data)
+
     @property
     def complete(self):
         """Returns true if we have recieved all data that exists on the endpoint"""
         return self.size >= self.count
 
-    def __call__(self, func, *args, **kwargs):
-        """Call function on each data entry"""
+    def _columns(self, columns):
+        if self.entries is None:
+            raise ArgumentError(
+                "Entries are not kept, use keep_entries=True for columnar export"
+            )
+
+        columns = columns or columnar.default_columns(self.deserializer)
+
+        if not columns:
+            raise ArgumentError(
+                "No default columns for {}, columns must be specified".format(
+                    self.deserializer
+                )
+            )
+
+        return columns
+
+    def to_records(self, columns=None):
+        """Return entries as a numpy record array, built directly from the
+        response. columns is a list of act.api.columnar.Column (default
+        columns for facts and objects). Requires numpy"""
+
+        return columnar.to_records(self.entries, self._columns(columns))
+
+    def to_pandas(self, columns=None):
+        """Return entries as a pandas DataFrame (see to_records). Requires
+        pandas"""
 
-        self.data = [getattr(item, func)(*args, **kwargs) for item in self.data]
+        return columnar.to_pandas(self.entries, self._columns(columns))
+
+    def to_arrow(self, columns=None):
+        """Return entries as a pyarrow Table (see to_records). Requires
+        pyarrow and numpy"""
+
+        return columnar.to_arrow(self.entries, self._columns(columns))
+
+    def __call__(self, func, *args, **kwargs):
+        """Call function on each data entry. In lazy result sets, the function
+        is called on the remaining entries when they are deserialized"""
+
+        self._data = [
+            item if item is _PENDING else getattr(item, func)(*args, **kwargs)
+            for item in self._data
+        ]
+        self._calls.append((func, args, kwargs))
         return self
 
     def __len__(self):
         """Returns the number of entries"""
-        return len(self.data)
+        return len(self._data)
 
     def __getitem__(self, sliced):
-        return self.data[sliced]
+        """Return entry at index, or list of entries in slice. Only the
+        entries returned are deserialized"""
+
+        if isinstance(sliced, slice):
+            indexes = range(len(self._data))[sliced]
+            self._materialize(indexes)
+            return [self._data[i] for i in indexes]
+
+        index = range(len(self._data))[sliced]
+        self._materialize([index])
+        return self._data[index]
 
     def __str__(self):
         if not self.data:
@@ -196,9 +595,115 @@ class ActResultSet(object):
 
         return repr(self.data)
 
+    def __iter__(self):
+        """Iterate over the entries, deserializing entries as they are
+        reached"""
+
+        for i in range(len(self._data)):
+            if self._data[i] is _PENDING:
+                self._materialize(range(i, min(i + ITER_CHUNK, len(self._data))))
+            yield self._data[i]
+
+
+class StreamingResultSet(object):
+    """Represents a stream of Act entries, decoded incrementally from the
+    response while iterating. Only one entry is held in memory at a time, so
+    the result set can only be iterated once."""
+
+    # Metadata in response -> attribute
+    METADATA = {
+        "size": "size",
+        "count": "count",
+        "limit": "limit",
+        "responseCode": "status_code",
+    }
+
+    def __init__(
+        self, response, deserializer, config=None, chunk_size=65536, lazy_fields=False
+    ):
+        """Initialize result set and read metadata preceding the entries
+        Args:
+            response (Response):  Streamed requests.Response from Act. See
+                                  ActResultSet for the fields in the response.
+                                  Metadata after the entries (e.g. size) is
+                                  available when the stream is consumed.
+            deserializer (class): Deseralizer class (or function)
+            chunk_size (int):     Number of bytes read from the response at a time
+            lazy_fields (bool):   Deserialize nested fields (objects, types etc)
+                                  on first access"""
+
+        self.response = response
+        self.deserializer = deserializer
+        self.config = config
+        self.lazy_fields = lazy_fields
+
+        self.size = None
+        self.count = None
+        self.limit = None
+        self.status_code = None
+
+        self._events = iter_json_object(response.iter_content(chunk_size), "data")
+
+        try:
+            for event, key, value in self._events:
+                if event == ARRAY_START:
+                    break
+                self._update(key, value)
+            else:
+                self.close()
+                raise ResponseError("Response should contain list in data")
+        except ValueError as err:
+            self.close()
+            raise ResponseError("Error decoding response: {}".format(err))
+
+    def _update(self, key, value):
+        if key == "data":
+            self.close()
+            raise ResponseError("Response should be list: {}".format(value))
+
+        if key in self.METADATA:
+            setattr(self, self.METADATA[key], value)
+
+    @property
+    def complete(self):
+        """Returns true if we have recieved all data that exists on the endpoint.
+        None if size is not known until the stream is consumed"""
+        if self.size is None or self.count is None:
+            return None
+        return self.size >= self.count
+
+    def close(self):
+        """Close response and release the connection"""
+        self.response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
     def __iter__(self):
         """Iterate over the entries"""
-        return self.data.__iter__()
+
+        interner = self.config.interner if self.config else None
+
+        try:
+            for event, key, value in self._events:
+                if event != ITEM:
+                    self._update(key, value)
+                    continue
+
+                with lazy_deserialization(self.lazy_fields), interning(interner):
+                    item = self.deserializer(**value)
+
+                if isinstance(item, ActBase):
+                    item.configure(self.config)
+
+                yield item
+        except ValueError as err:
+            raise ResponseError("Error decoding response: {}".format(err))
+        finally:
+            self.close()
 
 
 class Config(object):
@@ -221,6 +726,18 @@ class Config(object):
         object_formatter=None,
         strict_validator=False,
         acl=[],
+        pool_connections=10,
+        pool_maxsize=10,
+        pool_block=False,
+        keep_alive=True,
+        retry_policy=None,
+        rate_limiter=None,
+        circuit_breaker=None,
+        compress_threshold=None,
+        json_codec=None,
+        single_flight=None,
+        intern_size=None,
+        response_cache=None,
     ):
         """
         act_baseurl - url to ACT instance
@@ -232,6 +749,27 @@ class Config(object):
         object_validator: function that should return True if object validates, otherwise None
         object_formatter: function that should return a formatted version of the type (e.g. lowercase)
 
+        pool_connections - number of hosts to keep connection pools for
+        pool_maxsize - maximum number of connections kept per host
+        pool_block - block when the pool is exhausted instead of opening extra connections
+        keep_alive - reuse connections between requests
+        retry_policy - act.api.transport.RetryPolicy used to retry requests that
+                       fail with ServiceTimeout or connection errors
+        rate_limiter - act.api.transport.RateLimiter used to limit the request rate
+        circuit_breaker - act.api.transport.CircuitBreaker used to fail fast
+                          when the API is unavailable
+        compress_threshold - compress POST/PUT bodies of this size (bytes) or larger
+                             with gzip (None=disabled)
+        json_codec - JSON codec (json, orjson, ujson, auto or act.api.codec.JSONCodec
+                     instance) used for requests, responses and Schema.json()
+        single_flight - act.api.transport.SingleFlight used to coalesce identical
+                        GET requests that are in flight at the same time
+        intern_size - share frozen instances of object types, fact types, origins,
+                      organizations and namespaces in results, keeping at most
+                      this number of instances (None=disabled)
+        response_cache - act.api.transport.ResponseCache used to cache responses
+                         from searches, traversals and type lookups
+
         Only one of origin_name of origin_id must be specified.
         """
 
@@ -252,19 +790,118 @@ class Config(object):
         self.object_formatter = object_formatter
         self.strict_validator = strict_validator
         self.acl = acl
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.compress_threshold = compress_threshold
+        self.codec = get_codec(json_codec)
+        self.single_flight = single_flight
+        self.interner = Interner(intern_size) if intern_size else None
+        self.response_cache = response_cache
+
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Pooled session shared by all requests using this config. The
+        session is created on first use and closed by close()"""
+
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = create_session(
+                        self.pool_connections,
+                        self.pool_maxsize,
+                        self.pool_block,
+                        self.keep_alive,
+                    )
+                    # Make sure connections are released if config is
+                    # garbage collected without being closed
+                    weakref.finalize(self, session.close)
+                    self._session = session
+
+        return self._session
+
+    def close(self):
+        """Close pooled session (a new session is created on next request)"""
+
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def __deepcopy__(self, memo):
+        # Config is shared between all objects created from the same
+        # Act instance, so copies of facts should reference the same config
+        return self
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+
+        # Sessions and locks can not be pickled
+        state["_session"] = None
+        del state["_session_lock"]
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._session_lock = threading.Lock()
+
+
+class Request(NamedTuple):
+    """Request to the API yielded by request plans (see request_plan).
+    json is sent as body for POST and PUT, and params are URL encoded"""
+
+    method: Text
+    uri: Text
+    json: Optional[Dict] = None
+    params: Optional[Dict] = None
+    stream: bool = False
+
+
+def request_plan(func):
+    """Decorator for methods written as request plans: generators that yield
+    Request and receive the decoded response (or requests.Response for
+    streamed requests), and return the result of the method.
+
+    The decorated method runs the plan with blocking requests (see
+    ActBase.run_plan), so callers see a normal method. The plan itself is
+    available with plan(), so it can be run by other drivers (e.g.
+    act.api.aio.AsyncAct) or used in other plans with "yield from"."""
+
+    @functools.wraps(func)
+    def run(self, *args, **kwargs):
+        return self.run_plan(func(self, *args, **kwargs))
+
+    run.plan = func
+    return run
+
+
+def plan(method, *args, **kwargs):
+    """Return request plan of bound method decorated with request_plan, e.g.
+    plan(fact.add)"""
+
+    return method.plan(method.__self__, *args, **kwargs)
 
 
 class ActBase(Schema):
     """Act object inheriting Schema, to support serializing and
     deserializing."""
 
-    config = None
+    __slots__ = ("config",)
 
     SCHEMA = []
 
     @schema_doc(SCHEMA)
     def __init__(self, *args, **kwargs):
         super(ActBase, self).__init__(*args, **kwargs)
+        self.config = None
 
     def configure(self, config):
         """Set config object"""
@@ -280,20 +917,94 @@ class ActBase(Schema):
             self.config.user_id,
             "{}/{}".format(self.config.act_baseurl, uri),
             self.config.requests_common_kwargs,
+            session=self.config.session,
+            retry_policy=self.config.retry_policy,
+            rate_limiter=self.config.rate_limiter,
+            circuit_breaker=self.config.circuit_breaker,
+            codec=self.config.codec,
+            single_flight=self.config.single_flight,
+            response_cache=self.config.response_cache,
             **kwargs,
         )
 
         return response
 
+    def invalidate_cache(self, *endpoints):
+        """Remove responses from endpoints (all if no endpoints are given)
+        from the response cache. Returns number of responses removed"""
+
+        if not (self.config and self.config.response_cache):
+            return 0
+
+        return self.config.response_cache.invalidate(*endpoints)
+
+    def invalidate_after_write(self, *endpoints):
+        """Remove responses affected by a write from the response cache, if
+        the cache is configured with invalidate_on_write"""
+
+        if not (self.config and self.config.response_cache):
+            return 0
+
+        if not self.config.response_cache.invalidate_on_write:
+            return 0
+
+        return self.config.response_cache.invalidate(*endpoints)
+
+    def api_send(self, req):
+        """Send Request to API and return the response"""
+
+        kwargs = {}
+
+        if req.method in ("POST", "PUT"):
+            kwargs["json"] = req.json or {}
+            kwargs["compress_threshold"] = self.config.compress_threshold
+        else:
+            kwargs["params"] = req.params
+
+        if req.stream:
+            kwargs["stream"] = True
+
+        return self.api_request(req.method, req.uri, **kwargs)
+
+    def run_plan(self, plan):
+        """Run request plan (see request_plan) with blocking requests and
+        return the result"""
+
+        try:
+            req = next(plan)
+
+            while True:
+                req = plan.send(self.api_send(req))
+        except StopIteration as stop:
+            return stop.value
+
     def api_post(self, uri, **kwargs):
-        """Send POST request to API with keywords as JSON arguments"""
+        """Send POST request to API with keywords as JSON arguments. The body
+        is compressed if it is larger than compress_threshold in config"""
 
-        return self.api_request("POST", uri, json=kwargs)
+        return self.api_request(
+            "POST", uri, json=kwargs, compress_threshold=self.config.compress_threshold
+        )
 
     def api_put(self, uri, **kwargs):
-        """Send PUT request to API with keywords as JSON arguments"""
+        """Send PUT request to API with keywords as JSON arguments. The body
+        is compressed if it is larger than compress_threshold in config"""
 
-        return self.api_request("PUT", uri, json=kwargs)
+        return self.api_request(
+            "PUT", uri, json=kwargs, compress_threshold=self.config.compress_threshold
+        )
+
+    def api_post_stream(self, uri, **kwargs):
+        """Send POST request to API with keywords as JSON arguments and
+        return the requests.Response with the body unread"""
+
+        return self.api_request(
+            "POST",
+            uri,
+            json=kwargs,
+            compress_threshold=self.config.compress_threshold,
+            stream=True,
+        )
 
     def api_delete(self, uri, params=None):
         """Send DELETE request to API
@@ -311,6 +1022,15 @@ class ActBase(Schema):
 
         return self.api_request("GET", uri, params=params)
 
+    def json(self, exclude_none=True, to_camel_case=True):
+        """Serialize as JSON using the codec in config"""
+
+        return super(ActBase, self).json(
+            exclude_none=exclude_none,
+            to_camel_case=to_camel_case,
+            codec=self.config.codec if self.config else None,
+        )
+
     def __eq__(self, other):
         "Equality operator"
 
@@ -326,6 +1046,10 @@ class ActBase(Schema):
 class NameSpace(ActBase):
     """Namespace - serialized object specifying Namespace"""
 
+    __slots__ = ()
+
+    INTERN = True
+
     SCHEMA = [
         Field("name"),
         Field("id"),
@@ -343,6 +1067,10 @@ class NameSpace(ActBase):
 class Organization(ActBase):
     """Manage Organization"""
 
+    __slots__ = ()
+
+    INTERN = True
+
     SCHEMA = [
         Field("name"),
         Field("id"),
@@ -373,6 +1101,8 @@ def origin_serializer(origin):
 class UserReference(ActBase):
     """Represent Users (named Subject in API)"""
 
+    __slots__ = ()
+
     SCHEMA = [
         Field("name"),
         Field("id"),
@@ -388,6 +1118,10 @@ class UserReference(ActBase):
 class Origin(ActBase):
     """Manage Origin"""
 
+    __slots__ = ()
+
+    INTERN = True
+
     SCHEMA = [
         Field("name"),
         Field("id"),
@@ -408,22 +1142,25 @@ class Origin(ActBase):
     def __init__(self, *args, **kwargs):
         super(Origin, self).__init__(*args, **kwargs)
 
+    @request_plan
     def get(self):
         """Get Origin"""
 
         if not self.id:
             raise MissingField("Must have fact ID to get origin")
 
-        origin = self.api_get("v1/origin/uuid/{}".format(self.id))["data"]
+        origin = (yield Request("GET", "v1/origin/uuid/{}".format(self.id)))["data"]
         self.data = {}
         self.deserialize(**origin)
         return self
 
+    @request_plan
     def add(self):
         """Add Origin"""
         params = self.serialize()
 
-        origin = self.api_post("v1/origin", **params)["data"]
+        origin = (yield Request("POST", "v1/origin", json=params))["data"]
+        self.invalidate_after_write("v1/origin")
 
         # Empty data and load new result from response
         self.data = {}
@@ -433,13 +1170,15 @@ class Origin(ActBase):
 
         return self
 
+    @request_plan
     def delete(self):
         """Delete Origin"""
 
         if not self.id:
             raise MissingField("Must have fact ID to delete origin")
 
-        origin = self.api_delete("v1/origin/uuid/{}".format(self.id))["data"]
+        origin = (yield Request("DELETE", "v1/origin/uuid/{}".format(self.id)))["data"]
+        self.invalidate_after_write("v1/origin", "v1/origin/uuid/{}".format(self.id))
         self.data = {}
         self.deserialize(**origin)
 
@@ -450,6 +1189,8 @@ class Origin(ActBase):
 class Comment(ActBase):
     """Namespace - serialized object specifying Namespace"""
 
+    __slots__ = ()
+
     SCHEMA = [
         Field("comment"),
         Field("id"),
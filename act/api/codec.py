@@ -0,0 +1,123 @@
+"""JSON codecs used to encode requests, decode responses and serialize
+Schema objects (json())
+
+The standard library json module is used by default. orjson or ujson can be
+used for faster encoding/decoding if they are installed. The codec changes the
+text produced by json(), e.g. the facts written by handle_facts(), not only
+the requests sent. All codecs keep the order of keys, but compared to the
+standard library:
+
+- orjson and ujson use compact separators (no whitespace)
+- orjson writes non-ASCII characters as UTF-8, where the standard library and
+  ujson escape them ("æøå" is written as "\\u00e6\\u00f8\\u00e5")
+- orjson formats some floats differently (1e20, not 1e+20)"""
+
+import json
+
+
+class JSONCodec(object):
+    """JSON codec using the json module in the standard library"""
+
+    name = "json"
+
+    def dumps(self, obj):
+        """Encode obj as JSON string"""
+        return json.dumps(obj)
+
+    def encode(self, obj):
+        """Encode obj as UTF-8 encoded JSON"""
+        return self.dumps(obj).encode("utf-8")
+
+    def loads(self, data):
+        """Decode JSON from str or bytes. Raises ValueError on invalid JSON"""
+        return json.loads(data)
+
+    def __getstate__(self):
+        # Codec modules can not be pickled, so they are imported again
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+
+class OrjsonCodec(JSONCodec):
+    """JSON codec using orjson"""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson  # pylint: disable=import-outside-toplevel
+
+        self._orjson = orjson
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj).decode("utf-8")
+
+    def encode(self, obj):
+        return self._orjson.dumps(obj)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+class UjsonCodec(JSONCodec):
+    """JSON codec using ujson"""
+
+    name = "ujson"
+
+    def __init__(self):
+        import ujson  # pylint: disable=import-outside-toplevel
+
+        self._ujson = ujson
+
+    def dumps(self, obj):
+        return self._ujson.dumps(obj, escape_forward_slashes=False)
+
+    def encode(self, obj):
+        return self.dumps(obj).encode("utf-8")
+
+    def loads(self, data):
+        return self._ujson.loads(data)
+
+
+CODECS = {
+    "json": JSONCodec,
+    "orjson": OrjsonCodec,
+    "ujson": UjsonCodec,
+}
+
+# Preferred codecs when codec is "auto"
+AUTO_CODECS = ["orjson", "ujson", "json"]
+
+DEFAULT_CODEC = JSONCodec()
+
+
+def get_codec(codec=None):
+    """Return JSON codec
+
+    Args:
+        codec (str|JSONCodec):  Name of codec (json, orjson or ujson), "auto"
+                                to use the fastest codec installed, or a codec
+                                instance. The standard library json module
+                                is used if not specified.
+
+    Raises ImportError if the codec is not installed and ValueError on unknown
+    codec names."""
+
+    if codec is None:
+        return DEFAULT_CODEC
+
+    if isinstance(codec, JSONCodec):
+        return codec
+
+    if codec == "auto":
+        for name in AUTO_CODECS:
+            try:
+                return CODECS[name]()
+            except ImportError:
+                continue
+
+    if codec not in CODECS:
+        raise ValueError("Unknown JSON codec: {}".format(codec))
+
+    return CODECS[codec]()
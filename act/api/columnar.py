@@ -0,0 +1,159 @@
+"""Columnar export of search results
+
+Builds columns directly from the entries in the response (the "data" array)
+without creating Fact/Object instances. The columns can be exported as a
+NumPy record array, a pandas DataFrame or an Arrow table. numpy, pandas and
+pyarrow are optional and only imported when used."""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Column kinds
+STRING = "string"
+FLOAT = "float"
+TIMESTAMP = "timestamp"  # datetime64[ms] (UTC)
+
+
+class Column(NamedTuple):
+    """Column in export. path is the keys of the value in each entry"""
+
+    name: str
+    path: Tuple[str, ...]
+    kind: str = STRING
+
+
+FACT_COLUMNS = [
+    Column("id", ("id",)),
+    Column("type", ("type", "name")),
+    Column("value", ("value",)),
+    Column("source_type", ("sourceObject", "type", "name")),
+    Column("source_value", ("sourceObject", "value")),
+    Column("destination_type", ("destinationObject", "type", "name")),
+    Column("destination_value", ("destinationObject", "value")),
+    Column("in_reference_to", ("inReferenceTo", "id")),
+    Column("origin", ("origin", "name")),
+    Column("organization", ("organization", "name")),
+    Column("confidence", ("confidence",), FLOAT),
+    Column("trust", ("trust",), FLOAT),
+    Column("timestamp", ("timestamp",), TIMESTAMP),
+    Column("last_seen_timestamp", ("lastSeenTimestamp",), TIMESTAMP),
+]
+
+OBJECT_COLUMNS = [
+    Column("id", ("id",)),
+    Column("type", ("type", "name")),
+    Column("value", ("value",)),
+]
+
+# Default columns by name of deserializer in ActResultSet
+DEFAULT_COLUMNS = {
+    "Fact": FACT_COLUMNS,
+    "MetaFact": FACT_COLUMNS,
+    "auto_fact_type": FACT_COLUMNS,
+    "Object": OBJECT_COLUMNS,
+}
+
+
+def default_columns(deserializer: Any) -> Optional[List[Column]]:
+    """Return default columns for results from deserializer (None if there
+    are no default columns)"""
+
+    return DEFAULT_COLUMNS.get(getattr(deserializer, "__name__", None))
+
+
+def column_values(entries: Sequence[Dict], path: Tuple[str, ...]) -> List[Any]:
+    """Return list of values at path in each entry (None if missing)"""
+
+    if len(path) == 1:
+        (key,) = path
+        return [entry.get(key) for entry in entries]
+
+    if len(path) == 2:
+        key, subkey = path
+        return [(entry.get(key) or {}).get(subkey) for entry in entries]
+
+    values = []
+    for entry in entries:
+        value = entry
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        values.append(value)
+
+    return values
+
+
+def to_columns(
+    entries: Sequence[Dict], columns: Optional[Sequence[Column]] = None
+) -> Dict[str, List[Any]]:
+    """Return dict of column name -> list of values"""
+
+    return {
+        column.name: column_values(entries, column.path)
+        for column in (FACT_COLUMNS if columns is None else columns)
+    }
+
+
+def to_numpy(
+    entries: Sequence[Dict], columns: Optional[Sequence[Column]] = None
+) -> Dict[str, Any]:
+    """Return dict of column name -> numpy array. Strings are object arrays,
+    missing floats are NaN and missing timestamps are NaT"""
+
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    arrays = {}
+
+    for column in (FACT_COLUMNS if columns is None else columns):
+        values = column_values(entries, column.path)
+
+        if column.kind == FLOAT:
+            arrays[column.name] = numpy.array(values, dtype="float64")
+        elif column.kind == TIMESTAMP:
+            # Timestamps are UTC (numpy does not support the Z suffix)
+            arrays[column.name] = numpy.array(
+                [value.rstrip("Z") if value else None for value in values],
+                dtype="datetime64[ms]",
+            )
+        else:
+            arrays[column.name] = numpy.array(values, dtype=object)
+
+    return arrays
+
+
+def to_records(entries: Sequence[Dict], columns: Optional[Sequence[Column]] = None):
+    """Return numpy record array"""
+
+    import numpy  # pylint: disable=import-outside-toplevel
+
+    arrays = to_numpy(entries, columns)
+
+    return numpy.rec.fromarrays(list(arrays.values()), names=list(arrays))
+
+
+def to_pandas(entries: Sequence[Dict], columns: Optional[Sequence[Column]] = None):
+    """Return pandas DataFrame"""
+
+    import pandas  # pylint: disable=import-outside-toplevel
+
+    return pandas.DataFrame(to_numpy(entries, columns))
+
+
+def to_arrow(entries: Sequence[Dict], columns: Optional[Sequence[Column]] = None):
+    """Return pyarrow Table. Missing values are null"""
+
+    import pyarrow  # pylint: disable=import-outside-toplevel
+
+    types = {STRING: pyarrow.string(), FLOAT: pyarrow.float64()}
+
+    columns = FACT_COLUMNS if columns is None else columns
+    arrays = to_numpy(entries, [c for c in columns if c.kind == TIMESTAMP])
+
+    return pyarrow.table(
+        {
+            column.name: pyarrow.array(arrays[column.name], from_pandas=True)
+            if column.kind == TIMESTAMP
+            else pyarrow.array(
+                column_values(entries, column.path), type=types[column.kind]
+            )
+            for column in columns
+        }
+    )
@@ -1,10 +1,9 @@
-import copy
+import glob
 import hashlib
-import json
 import re
 import time
 from logging import error, info, warning
-from typing import Any, Iterable, Union
+from typing import Any, Dict, Iterable, List, Type, Union
 
 import act.api
 from act.api.re import UUID_MATCH
@@ -16,8 +15,10 @@ from .base import (
     NameSpace,
     Organization,
     Origin,
+    Request,
     UserReference,
     origin_serializer,
+    request_plan,
 )
 from .obj import Object, ObjectType
 from .schema import Field, MissingField, ValidationError, schema_doc
@@ -34,6 +35,8 @@ class UnknownType(Exception):
 
 
 class RelevantObjectBindings(ActBase):
+    __slots__ = ()
+
     SCHEMA = [
         Field(
             "source_object_type",
@@ -62,6 +65,8 @@ class RelevantObjectBindings(ActBase):
 class RelevantFactBindings(ActBase):
     """Meta Fact Type"""
 
+    __slots__ = ()
+
     SCHEMA = [
         Field("name"),
         Field("id"),
@@ -89,6 +94,10 @@ class RelevantFactBindings(ActBase):
 class FactType(ActBase):
     """Manage FactType"""
 
+    __slots__ = ()
+
+    INTERN = True
+
     SCHEMA = [
         Field("name"),
         Field("id"),
@@ -104,10 +113,12 @@ class FactType(ActBase):
     def __init__(self, *args, **kwargs):
         super(FactType, self).__init__(*args, **kwargs)
 
+    @request_plan
     def add(self):
         params = self.serialize()
 
-        fact_type = self.api_post("v1/factType", **params)["data"]
+        fact_type = (yield Request("POST", "v1/factType", json=params))["data"]
+        self.invalidate_after_write("v1/factType")
 
         # Empty data and load new result from response
         self.data = {}
@@ -134,6 +145,7 @@ class FactType(ActBase):
             ]
         )
 
+    @request_plan
     def add_object_bindings(self, add_bindings):
         """Add multiple object bindings
         Args:
@@ -157,7 +169,10 @@ class FactType(ActBase):
 
         serialized_bindings = [binding.serialize() for binding in new_bindings]
 
-        fact_type = self.api_put(url, addObjectBindings=serialized_bindings)["data"]
+        fact_type = (
+            yield Request("PUT", url, json={"addObjectBindings": serialized_bindings})
+        )["data"]
+        self.invalidate_after_write("v1/factType")
 
         self.data = {}
         self.deserialize(**fact_type)
@@ -183,6 +198,7 @@ class FactType(ActBase):
             [RelevantFactBindings(name=fact_type.name, id=fact_type.id)]
         )
 
+    @request_plan
     def add_fact_bindings(self, add_bindings):
         """Add multiple fact bindings
         Args:
@@ -205,7 +221,10 @@ class FactType(ActBase):
 
         serialized_bindings = [binding.serialize() for binding in new_bindings]
 
-        fact_type = self.api_put(url, addFactBindings=serialized_bindings)["data"]
+        fact_type = (
+            yield Request("PUT", url, json={"addFactBindings": serialized_bindings})
+        )["data"]
+        self.invalidate_after_write("v1/factType")
 
         self.data = {}
         self.deserialize(**fact_type)
@@ -219,6 +238,7 @@ class FactType(ActBase):
             )
         return self
 
+    @request_plan
     def rename(self, name):
         if not self.id:
             raise MissingField("Must have fact type ID")
@@ -226,7 +246,8 @@ class FactType(ActBase):
         old_name = self.name
 
         url = "v1/factType/uuid/{}".format(self.id)
-        fact_type = self.api_put(url, name=name)["data"]
+        fact_type = (yield Request("PUT", url, json={"name": name}))["data"]
+        self.invalidate_after_write("v1/factType")
 
         self.data = {}
         self.deserialize(**fact_type)
@@ -257,7 +278,35 @@ def object_serializer(obj):
     return "{}/{}".format(obj.type.name, obj.value)
 
 
+def cache_endpoints(fact):
+    """Return endpoints with cached responses that may include fact (see
+    act.api.transport.ResponseCache): searches, traversals and facts of the
+    objects and the referenced fact"""
+
+    endpoints = ["v1/fact/search", "v1/object/search", "v1/object/*/traverse"]
+
+    for obj in (fact.source_object, fact.destination_object):
+        if not obj:
+            continue
+
+        if obj.id:
+            endpoints.append("v1/object/uuid/{}/facts".format(obj.id))
+
+        if obj.type and obj.type.name and obj.value:
+            endpoints.append(
+                glob.escape("v1/object/{}/{}/facts".format(obj.type.name, obj.value))
+            )
+
+    for fact_id in (fact.id, fact.in_reference_to and fact.in_reference_to.id):
+        if fact_id:
+            endpoints.append("v1/fact/uuid/{}*".format(fact_id))
+
+    return endpoints
+
+
 class AbstractFact(ActBase):
+    __slots__ = ()
+
     SCHEMA = [
         Field(
             "type", deserializer=FactType, serializer=lambda fact_type: fact_type.name
@@ -286,13 +335,14 @@ class AbstractFact(ActBase):
     def __init__(self, *args, **kwargs):
         super(AbstractFact, self).__init__(*args, **kwargs)
 
+    @request_plan
     def get(self):
         """Get fact"""
 
         if not self.id:
             raise MissingField("Must have fact ID to get, or use search instead")
 
-        fact = self.api_get("v1/fact/uuid/{}".format(self.id))["data"]
+        fact = (yield Request("GET", "v1/fact/uuid/{}".format(self.id)))["data"]
         self.data = {}
         self.deserialize(**fact)
         return self
@@ -381,9 +431,11 @@ class AbstractFact(ActBase):
             comment=comment,
             replyTo=reply_to,
         )
+        self.invalidate_after_write("v1/fact/uuid/{}/comments".format(self.id))
 
         return self
 
+    @request_plan
     def retract(
         self, organization=None, source=None, access_mode=None, comment=None, acl=[]
     ):
@@ -411,11 +463,14 @@ class AbstractFact(ActBase):
         else:
             raise MissingField("Must have object ID to retract object")
 
-        fact = self.api_post(url, **params)["data"]
+        fact = (yield Request("POST", url, json=params))["data"]
 
         meta = MetaFact(**fact)
         # Add config to meta fact (user/auth)
         meta.configure(self.config)
+
+        # Retracted facts are no longer returned by searches
+        self.invalidate_after_write(*cache_endpoints(self), *cache_endpoints(meta))
         meta.set_defaults()
 
         return meta
@@ -463,6 +518,8 @@ class AbstractFact(ActBase):
 class Fact(AbstractFact):
     """Manage facts"""
 
+    __slots__ = ()
+
     SCHEMA = AbstractFact.SCHEMA + [
         Field("in_reference_to", serializer=False),
     ]
@@ -583,6 +640,7 @@ class Fact(AbstractFact):
 
         return self
 
+    @request_plan
     def add(self):
         """Add fact"""
         started = time.time()
@@ -611,14 +669,17 @@ class Fact(AbstractFact):
             )
             params["value"] = None
 
-        fact = self.api_post("v1/fact", **params)["data"]
+        fact = (yield Request("POST", "v1/fact", json=params))["data"]
 
         # Empty data and load new result from response
         self.data = {}
         self.deserialize(**fact)
 
+        self.invalidate_after_write(*cache_endpoints(self))
+
         info(
-            "Created fact in %.2fs: data=%s" % (time.time() - started, json.dumps(fact))
+            "Created fact in %.2fs: data=%s"
+            % (time.time() - started, self.config.codec.dumps(fact))
         )
 
         return self
@@ -650,6 +711,7 @@ class Fact(AbstractFact):
         return meta
 
     # pylint: disable=unused-argument,dangerous-default-value
+    @request_plan
     def get_meta(self, before=None, after=None, limit=None):
         """Get meta facts
         Args:
@@ -668,13 +730,17 @@ class Fact(AbstractFact):
         if not self.id:
             raise MissingField("Must have fact ID to get comments")
 
-        res = self.api_get("v1/fact/uuid/{}/meta".format(self.id), params=params)
+        res = yield Request(
+            "GET", "v1/fact/uuid/{}/meta".format(self.id), params=params
+        )
         return act.api.base.ActResultSet(res, MetaFact, config=self.config)
 
 
 class MetaFact(AbstractFact):
     """Manage meta facts"""
 
+    __slots__ = ()
+
     SCHEMA = AbstractFact.SCHEMA + [
         Field("in_reference_to", deserializer=Fact),
     ]
@@ -697,6 +763,7 @@ class MetaFact(AbstractFact):
             )
         )
 
+    @request_plan
     def add(self):
         """Add meta fact to platform"""
 
@@ -718,26 +785,57 @@ class MetaFact(AbstractFact):
 
         url = "v1/fact/uuid/{}/meta".format(self.in_reference_to.id)
 
-        meta_fact = self.api_post(url, **params)["data"]
+        meta_fact = (yield Request("POST", url, json=params))["data"]
 
         self.data = {}
         self.deserialize(**meta_fact)
+
+        self.invalidate_after_write(*cache_endpoints(self))
         info(
             "Created meta fact in %.2fs: data=%s"
-            % (time.time() - started, json.dumps(meta_fact))
+            % (time.time() - started, self.config.codec.dumps(meta_fact))
         )
 
         return self
 
 
+def fact_class(entry: Dict) -> Type[Union[MetaFact, Fact]]:
+    """Guess type based on keys in dictionary and return class"""
+    if entry.get("inReferenceTo"):
+        return MetaFact
+    elif any([entry.get("sourceObject"), entry.get("destinationObject")]):
+        return Fact
+    else:
+        raise UnknownType("Unable to guess element type: {}".format(entry))
+
+
 def auto_fact_type(**kwargs: Any) -> Union[MetaFact, Fact]:
     """Guess type based on keys in dictionary and return Object"""
-    if kwargs.get("inReferenceTo"):
-        return MetaFact(**kwargs)
-    elif any([kwargs.get("sourceObject"), kwargs.get("destinationObject")]):
-        return Fact(**kwargs)
-    else:
-        raise UnknownType("Unable to guess element type: {}".format(kwargs))
+    return fact_class(kwargs)(**kwargs)
+
+
+def auto_fact_type_batch(
+    entries: List[Dict], config: Any = None
+) -> List[Union[MetaFact, Fact]]:
+    """Deserialize list of facts and meta facts (see auto_fact_type), with
+    each type deserialized in one batch"""
+
+    classes = [fact_class(entry) for entry in entries]
+
+    batches: Dict[Type, List[Dict]] = {}
+    for cls, entry in zip(classes, entries):
+        batches.setdefault(cls, []).append(entry)
+
+    deserialized = {
+        cls: iter(cls.deserialize_batch(batch, config=config))
+        for cls, batch in batches.items()
+    }
+
+    return [next(deserialized[cls]) for cls in classes]
+
+
+# Used by ActResultSet to deserialize all results in one pass
+auto_fact_type.deserialize_batch = auto_fact_type_batch  # type: ignore
 
 
 def fact_chain_seed(*facts):
@@ -785,7 +883,8 @@ def fact_chain(*facts: Fact) -> Iterable[Fact]:
     # Calculate the hash for this chain, based on the seed
     sha256sum = hashlib.sha256(fact_chain_seed(*facts).encode("utf8")).hexdigest()
 
-    chain: Iterable[Fact] = copy.copy(facts)
+    # Placeholders are replaced in copies, so the facts are not modified
+    chain: Iterable[Fact] = [fact.clone() for fact in facts]
 
     # Return the fact chain, with all object values replaced "[placeholder[<HASH>]]"
     for fact in chain:
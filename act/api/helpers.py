@@ -1,21 +1,24 @@
-import copy
 import functools
 import ipaddress
 import itertools
 import os
 import sys
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from logging import error, warning
-from typing import Iterable, List, Optional, Text, TextIO, Tuple
+from typing import (Any, Callable, Iterable, Iterator, List, NamedTuple,
+                    Optional, Set, Text, TextIO, Tuple, Union)
 
 import act.api
 
 from . import DEFAULT_FACT_VALIDATOR, DEFAULT_METAFACT_VALIDATOR
-from .base import ActBase, Config, Origin, ValidationError
+from .base import (ActBase, Config, Origin, Request, ValidationError, plan,
+                   request_plan)
 from .fact import (Fact, FactType, MetaFact, RelevantFactBindings,
                    RelevantObjectBindings, auto_fact_type)
 from .obj import Object, ObjectType
 from .schema import schema_doc
+from .transport import CacheStats
 
 
 def as_list(value):
@@ -31,7 +34,8 @@ def format_and_validate(facts: Iterable[Fact]) -> List[Fact]:
 
     fact_copies: List[Fact] = []
     for fact in facts:
-        fact_copy = copy.deepcopy(fact)
+        # Reference types (e.g. FactType, Origin) and config are shared
+        fact_copy = fact.clone()
 
         config = fact_copy.config
 
@@ -53,10 +57,62 @@ def format_and_validate(facts: Iterable[Fact]) -> List[Fact]:
     return fact_copies
 
 
+class AddResult(NamedTuple):
+    """Result of adding a fact with add_facts(). error is set if the
+    fact could not be added"""
+
+    fact: Union[Fact, MetaFact]
+    error: Optional[Exception]
+
+    @property
+    def id(self) -> Optional[Text]:
+        """Fact ID assigned by the platform"""
+        if self.error:
+            return None
+        return self.fact.id
+
+
+def add_fact(fact: Union[Fact, MetaFact]) -> AddResult:
+    """Add fact and return AddResult with the added fact or the error"""
+
+    try:
+        return AddResult(fact.add(), None)
+    # All errors are returned as part of the result for this fact,
+    # so they do not abort the other facts in the batch
+    except Exception as err:  # pylint: disable=broad-except
+        error("Unable to add fact %s: %s", fact, err)
+        return AddResult(fact, err)
+
+
+def add_facts(
+    facts: Iterable[Union[Fact, MetaFact]], workers: int = 10
+) -> List[AddResult]:
+    """
+    Add facts to the platform using a pool of `workers` concurrent requests
+
+    Returns a list of AddResult in the same order as the input facts. Errors
+    are not raised, but returned in the result for each fact.
+
+    Meta facts must reference facts that are already added to the platform,
+    since facts in the same batch are added in arbitrary order.
+    """
+
+    facts = list(facts)
+
+    if workers <= 1 or len(facts) <= 1:
+        return [add_fact(fact) for fact in facts]
+
+    with ThreadPoolExecutor(
+        max_workers=min(workers, len(facts)), thread_name_prefix="act-api"
+    ) as executor:
+        return list(executor.map(add_fact, facts))
+
+
 def handle_facts(
     facts: Iterable[Fact],
     output_format="json",
     output_filehandle: Optional[TextIO] = None,
+    workers: int = 1,
 ) -> List[Fact]:
     """
 
@@ -65,6 +121,9 @@ def handle_facts(
 
     ValidationError will cause none of the facts to be handled
 
+    If workers > 1, facts are added to the platform using concurrent requests.
+    The first error (if any) is raised after all facts are handled.
+
     """
 
     if not output_filehandle:
@@ -72,9 +131,14 @@ def handle_facts(
 
     facts = format_and_validate(facts)
 
+    add = []
+
     for fact in facts:
         if fact.config.act_baseurl:  # type: ignore
-            fact.add()
+            if workers > 1:
+                add.append(fact)
+            else:
+                fact.add()
         else:
             if output_format == "json":
                 output_filehandle.write("{}\n".format(fact.json()))
@@ -85,6 +149,10 @@ def handle_facts(
                     "Illegal output_format: {}".format(output_format)
                 )
 
+    for result in add_facts(add, workers):
+        if result.error:
+            raise result.error
+
     return facts
 
 
@@ -113,9 +181,100 @@ def handle_fact(
     return facts[0]
 
 
+def fact_timestamp(fact: Fact, before: Optional[Text] = None) -> Optional[Text]:
+    """Time the fact was added"""
+
+    return fact.timestamp
+
+
+def object_timestamp(obj: Object, before: Optional[Text] = None) -> Optional[Text]:
+    """Last time a fact was added to object before `before`, from the object
+    statistics"""
+
+    return max(
+        (
+            statistic.last_added_timestamp
+            for statistic in obj.statistics or []
+            if statistic.last_added_timestamp
+            and (not before or statistic.last_added_timestamp < before)
+        ),
+        default=None,
+    )
+
+
+def iter_search(
+    search: Callable[..., Any],
+    timestamp: Callable[[Any, Optional[Text]], Optional[Text]],
+    before: Optional[Text] = None,
+    all_ids: bool = False,
+) -> Iterator[Any]:
+    """
+    Yield all results from search(before=...), which must return a
+    StreamingResultSet of the most recent results added before `before`.
+
+    When a page is not complete, the next page is searched with `before` set
+    to the millisecond after the oldest timestamp(item, before) in the page.
+    Results with the oldest timestamp are returned again, and are dropped by
+    ID. Only IDs with the oldest timestamp are kept, unless all_ids is set
+    (for results that can be returned in more than one window, such as
+    objects).
+    """
+
+    seen: Set[Text] = set()
+
+    if before:
+        before = act.api.utils.search_timestamp(before)
+
+    while True:
+        oldest = None
+        boundary: Set[Text] = set()
+
+        with search(before=before) as page:
+            for item in page:
+                item_timestamp = timestamp(item, before)
+
+                if item_timestamp:
+                    item_timestamp = act.api.utils.search_timestamp(item_timestamp)
+
+                    if oldest is None or item_timestamp < oldest:
+                        oldest = item_timestamp
+                        boundary = set()
+
+                    if item_timestamp == oldest:
+                        boundary.add(item.id)
+
+                if item.id in seen:
+                    continue
+
+                if all_ids:
+                    seen.add(item.id)
+
+                yield item
+
+        if page.complete or oldest is None:
+            return
+
+        next_before = act.api.utils.search_timestamp(oldest, milliseconds=1)
+
+        if before and next_before >= before:
+            warning(
+                "More than one page of results with the same timestamp, "
+                + "results may be incomplete (before=%s)",
+                before,
+            )
+            return
+
+        if not all_ids:
+            seen = boundary
+
+        before = next_before
+
+
 class Act(ActBase):
     """Act class exposing most of the ACT API"""
 
+    __slots__ = ()
+
     SCHEMA = []
 
     def __init__(
@@ -134,6 +293,18 @@ class Act(ActBase):
         object_validator=None,
         object_formatter=None,
         strict_validator=False,
+        pool_connections=10,
+        pool_maxsize=10,
+        pool_block=False,
+        keep_alive=True,
+        retry_policy=None,
+        rate_limiter=None,
+        circuit_breaker=None,
+        compress_threshold=None,
+        json_codec=None,
+        single_flight=None,
+        intern_size=None,
+        response_cache=None,
     ):
         super(Act, self).__init__()
 
@@ -150,12 +321,70 @@ class Act(ActBase):
                 object_formatter,
                 strict_validator,
                 acl,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+                keep_alive=keep_alive,
+                retry_policy=retry_policy,
+                rate_limiter=rate_limiter,
+                circuit_breaker=circuit_breaker,
+                compress_threshold=compress_threshold,
+                json_codec=json_codec,
+                single_flight=single_flight,
+                intern_size=intern_size,
+                response_cache=response_cache,
             )
         )
 
         act.api.utils.setup_logging(log_level, log_file, log_prefix)
 
+    def add_facts(
+        self, facts: Iterable[Union[Fact, MetaFact]], workers: Optional[int] = None
+    ) -> List[AddResult]:
+        """Add facts to the platform using concurrent requests
+        Args:
+            facts (Fact[]):     Facts/meta facts to add
+            workers (int):      Number of concurrent requests
+                                (default=pool_maxsize from config)
+
+        Returns list of AddResult (fact, error) in the same order as facts.
+        """
+
+        return add_facts(facts, workers or self.config.pool_maxsize)
+
+    @property
+    def circuit_state(self) -> Optional[Text]:
+        """State of the circuit breaker (closed, open or half-open), or None
+        if no circuit breaker is configured"""
+
+        if not self.config.circuit_breaker:
+            return None
+
+        return self.config.circuit_breaker.state
+
+    @property
+    def cache_stats(self) -> Optional[CacheStats]:
+        """Statistics (hits, misses etc) of the response cache, or None if no
+        response cache is configured"""
+
+        if not self.config.response_cache:
+            return None
+
+        return self.config.response_cache.stats
+
+    def close(self):
+        """Close connections to the API"""
+
+        self.config.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
     # pylint: disable=unused-argument,dangerous-default-value
+    @request_plan
     def fact_search(
         self,
         keywords="",
@@ -169,6 +398,10 @@ class Act(ActBase):
         before=None,
         after=None,
         limit=None,
+        stream=False,
+        lazy_fields=False,
+        lazy=False,
+        keep_entries=False,
     ):
         """Search objects
         Args:
@@ -191,6 +424,15 @@ class Act(ActBase):
                                           2016-09-28T21:26:22Z
             limit (integer):              Limit the number of returned Objects
                                           (default 25). Limit must be <= 10000.
+            stream (bool):                Decode the response incrementally and
+                                          return StreamingResultSet
+            lazy_fields (bool):           Deserialize nested fields (objects,
+                                          types etc) on first access
+            lazy (bool):                  Deserialize results on first access
+                                          (not used with stream)
+            keep_entries (bool):          Keep entries from the response for
+                                          columnar export, e.g. to_pandas().
+                                          Implies lazy (not used with stream)
 
         All arguments are optional.
 
@@ -199,6 +441,7 @@ class Act(ActBase):
 
         params = act.api.utils.prepare_params(
             locals(),
+            exclude_params=["self", "stream", "lazy_fields", "lazy", "keep_entries"],
             ensure_list=[
                 "object_type",
                 "object_value",
@@ -209,11 +452,24 @@ class Act(ActBase):
             ],
         )
 
-        res = self.api_post("v1/fact/search", **params)
+        res = yield Request("POST", "v1/fact/search", json=params, stream=stream)
+
+        if stream:
+            return act.api.base.StreamingResultSet(
+                res, auto_fact_type, config=self.config, lazy_fields=lazy_fields
+            )
 
-        return act.api.base.ActResultSet(res, auto_fact_type, config=self.config)
+        return act.api.base.ActResultSet(
+            res,
+            auto_fact_type,
+            config=self.config,
+            lazy_fields=lazy_fields,
+            lazy=lazy,
+            keep_entries=keep_entries,
+        )
 
     # pylint: disable=unused-argument,dangerous-default-value
+    @request_plan
     def object_search(
         self,
         keywords="",
@@ -226,6 +482,10 @@ class Act(ActBase):
         before=None,
         after=None,
         limit=None,
+        stream=False,
+        lazy_fields=False,
+        lazy=False,
+        keep_entries=False,
     ):
         """Search objects
         Args:
@@ -249,6 +509,15 @@ class Act(ActBase):
                                           this format: 2016-09-28T21:26:22Z
             limit (integer):              Limit the number of returned Objects
                                           (default 25, 0 means all)
+            stream (bool):                Decode the response incrementally and
+                                          return StreamingResultSet
+            lazy_fields (bool):           Deserialize nested fields (objects,
+                                          types etc) on first access
+            lazy (bool):                  Deserialize results on first access
+                                          (not used with stream)
+            keep_entries (bool):          Keep entries from the response for
+                                          columnar export, e.g. to_pandas().
+                                          Implies lazy (not used with stream)
 
         All arguments are optional.
 
@@ -257,6 +526,7 @@ class Act(ActBase):
 
         params = act.api.utils.prepare_params(
             locals(),
+            exclude_params=["self", "stream", "lazy_fields", "lazy", "keep_entries"],
             ensure_list=[
                 "object_type",
                 "object_value",
@@ -267,9 +537,153 @@ class Act(ActBase):
             ],
         )
 
-        res = self.api_post("v1/object/search", **params)
+        res = yield Request("POST", "v1/object/search", json=params, stream=stream)
+
+        if stream:
+            return act.api.base.StreamingResultSet(
+                res, Object, config=self.config, lazy_fields=lazy_fields
+            )
+
+        return act.api.base.ActResultSet(
+            res,
+            Object,
+            config=self.config,
+            lazy_fields=lazy_fields,
+            lazy=lazy,
+            keep_entries=keep_entries,
+        )
+
+    def iter_fact_search(
+        self, *args, before=None, page_size=10000, lazy_fields=False, **kwargs
+    ):
+        """Search facts and yield all facts in the result, by paging through
+        the result with the before timestamp (see iter_search). Arguments are
+        the same as for fact_search, except limit and stream. page_size is the
+        limit in each search.
+
+        Each page is decoded incrementally, so only one fact is held in
+        memory at a time."""
+
+        if "limit" in kwargs or "stream" in kwargs:
+            raise act.api.base.ArgumentError(
+                "limit and stream are not supported, use page_size"
+            )
+
+        return iter_search(
+            functools.partial(
+                self.fact_search,
+                *args,
+                limit=page_size,
+                stream=True,
+                lazy_fields=lazy_fields,
+                **kwargs,
+            ),
+            fact_timestamp,
+            before=before,
+        )
+
+    def iter_object_search(
+        self, *args, before=None, page_size=10000, lazy_fields=False, **kwargs
+    ):
+        """Search objects and yield all objects in the result, by paging
+        through the result with the before timestamp (see iter_search).
+        Arguments are the same as for object_search, except limit and stream.
+        page_size is the limit in each search.
+
+        The timestamp of an object is the last time a fact was added to it
+        (from the object statistics). Objects match every window where they
+        have facts, so the IDs of all objects returned are kept to drop
+        duplicates."""
+
+        if "limit" in kwargs or "stream" in kwargs:
+            raise act.api.base.ArgumentError(
+                "limit and stream are not supported, use page_size"
+            )
+
+        return iter_search(
+            functools.partial(
+                self.object_search,
+                *args,
+                limit=page_size,
+                stream=True,
+                lazy_fields=lazy_fields,
+                **kwargs,
+            ),
+            object_timestamp,
+            before=before,
+            all_ids=True,
+        )
+
+    def sharded_fact_search(
+        self,
+        *args,
+        after,
+        before=None,
+        workers=None,
+        page_size=10000,
+        ordered=True,
+        lazy_fields=False,
+        **kwargs,
+    ):
+        """Search facts added from after to before, by searching time shards
+        concurrently (see act.api.search.sharded_search). Arguments are the
+        same as for fact_search, except limit and stream. page_size is the
+        limit in each search and workers the number of concurrent searches
+        (default pool_maxsize in config).
+
+        If ordered is True, facts are yielded with the most recent first.
+        Otherwise facts are yielded as soon as their shard is complete."""
+
+        if "limit" in kwargs or "stream" in kwargs:
+            raise act.api.base.ArgumentError(
+                "limit and stream are not supported, use page_size"
+            )
+
+        return act.api.search.sharded_search(
+            functools.partial(
+                self.fact_search, *args, lazy_fields=lazy_fields, **kwargs
+            ),
+            fact_timestamp,
+            after,
+            before,
+            workers=workers or self.config.pool_maxsize,
+            limit=page_size,
+            ordered=ordered,
+        )
+
+    def sharded_object_search(
+        self,
+        *args,
+        after,
+        before=None,
+        workers=None,
+        page_size=10000,
+        ordered=True,
+        lazy_fields=False,
+        **kwargs,
+    ):
+        """Search objects with facts added from after to before, by
+        searching time shards concurrently (see sharded_fact_search).
+        Objects can match more than one shard, so the IDs of all objects
+        returned are kept to drop duplicates."""
+
+        if "limit" in kwargs or "stream" in kwargs:
+            raise act.api.base.ArgumentError(
+                "limit and stream are not supported, use page_size"
+            )
 
-        return act.api.base.ActResultSet(res, self.object, config=self.config)
+        return act.api.search.sharded_search(
+            functools.partial(
+                self.object_search, *args, lazy_fields=lazy_fields, **kwargs
+            ),
+            object_timestamp,
+            after,
+            before,
+            workers=workers or self.config.pool_maxsize,
+            limit=page_size,
+            ordered=ordered,
+            partition=False,
+        )
 
     @schema_doc(Fact.SCHEMA)
     def fact(self, *args, **kwargs):
@@ -324,16 +738,20 @@ class Act(ActBase):
 
         return ObjectType(*args, **kwargs).configure(self.config)
 
+    @request_plan
     def get_fact_types(self):
         """Get fact types"""
 
-        return act.api.base.ActResultSet(self.api_get("v1/factType"), self.fact_type)
+        return act.api.base.ActResultSet(
+            (yield Request("GET", "v1/factType")), self.fact_type
+        )
 
+    @request_plan
     def get_object_types(self):
         """Get object types"""
 
         return act.api.base.ActResultSet(
-            self.api_get("v1/objectType"), self.object_type
+            (yield Request("GET", "v1/objectType")), self.object_type
         )
 
     @schema_doc(ObjectType.SCHEMA)
@@ -344,15 +762,17 @@ class Act(ActBase):
 
         return Origin(*args, **kwargs).configure(self.config)
 
+    @request_plan
     def get_origins(self, include_deleted=False, limit=25):
         """Get origins"""
 
         params = {"includeDeleted": include_deleted, "limit": limit}
 
         return act.api.base.ActResultSet(
-            self.api_get("v1/origin", params=params), self.origin
+            (yield Request("GET", "v1/origin", params=params)), self.origin
         )
 
+    @request_plan
     def create_fact_type(
         self,
         name,
@@ -374,10 +794,12 @@ Returns created fact type, or exisiting fact type if it already exists.
             object_bindings = []
 
         existing_fact_types = {
-            fact_type.name: fact_type for fact_type in self.get_fact_types()
+            fact_type.name: fact_type
+            for fact_type in (yield from plan(self.get_fact_types))
         }
         object_types = {
-            object_type.name: object_type for object_type in self.get_object_types()
+            object_type.name: object_type
+            for object_type in (yield from plan(self.get_object_types))
         }
 
         object_types[None] = None
@@ -431,28 +853,33 @@ Returns created fact type, or exisiting fact type if it already exists.
             warning("Fact type %s already exists" % name)
             fact_type = existing_fact_types[name]
             fact_type.configure(self.config)
-            fact_type.add_object_bindings(relevant_object_bindings)
+            yield from plan(fact_type.add_object_bindings, relevant_object_bindings)
         else:
-            fact_type = self.fact_type(
-                name=name,
-                validator_parameter=validator,
-                relevant_object_bindings=relevant_object_bindings,
-                default_confidence=default_confidence,
-            ).add()
+            fact_type = yield from plan(
+                self.fact_type(
+                    name=name,
+                    validator_parameter=validator,
+                    relevant_object_bindings=relevant_object_bindings,
+                    default_confidence=default_confidence,
+                ).add
+            )
 
         return fact_type
 
+    @request_plan
     def create_fact_type_all_bindings(
         self, name, validator_parameter=DEFAULT_FACT_VALIDATOR, default_confidence=1.0
     ):
         """Create a fact type that can be connected to all object types"""
 
         existing_fact_types = {
-            fact_type.name: fact_type for fact_type in self.get_fact_types()
+            fact_type.name: fact_type
+            for fact_type in (yield from plan(self.get_fact_types))
         }
 
         object_types = {
-            object_type.name: object_type for object_type in self.get_object_types()
+            object_type.name: object_type
+            for object_type in (yield from plan(self.get_object_types))
         }
 
         # Create list of all combiations of object types / bidirectional
@@ -469,18 +896,21 @@ Returns created fact type, or exisiting fact type if it already exists.
             # Do not create fact, but update bindings
             warning("Fact type %s already exists" % name)
             fact_type = existing_fact_types[name]
-            fact_type.add_object_bindings(bindings)
+            yield from plan(fact_type.add_object_bindings, bindings)
         else:
             # Create fact with bindings
-            fact_type = self.fact_type(
-                name=name,
-                validator_parameter=validator_parameter,
-                relevant_object_bindings=bindings,
-                default_confidence=default_confidence,
-            ).add()
+            fact_type = yield from plan(
+                self.fact_type(
+                    name=name,
+                    validator_parameter=validator_parameter,
+                    relevant_object_bindings=bindings,
+                    default_confidence=default_confidence,
+                ).add
+            )
 
         return fact_type
 
+    @request_plan
     def create_meta_fact_type(
         self, name, fact_bindings, validator=DEFAULT_METAFACT_VALIDATOR
     ):
@@ -494,7 +924,8 @@ Returns created fact type, or exisiting fact type if it already exists.
 """ % DEFAULT_METAFACT_VALIDATOR
 
         existing_fact_types = {
-            fact_type.name: fact_type for fact_type in self.get_fact_types()
+            fact_type.name: fact_type
+            for fact_type in (yield from plan(self.get_fact_types))
         }
 
         # Verify that all fact types exists
@@ -512,19 +943,22 @@ Returns created fact type, or exisiting fact type if it already exists.
 
         if name not in existing_fact_types:
             # New meta fact type
-            fact_type = self.fact_type(
-                name=name,
-                validator_parameter=validator,
-                relevant_fact_bindings=relevant_fact_bindings,
-            ).add()
+            fact_type = yield from plan(
+                self.fact_type(
+                    name=name,
+                    validator_parameter=validator,
+                    relevant_fact_bindings=relevant_fact_bindings,
+                ).add
+            )
         else:
             # Fact type already exists. Do not create, but update bindings
             warning("Fact type %s already exists" % name)
             fact_type = existing_fact_types[name]
-            fact_type.add_fact_bindings(relevant_fact_bindings)
+            yield from plan(fact_type.add_fact_bindings, relevant_fact_bindings)
 
         return fact_type
 
+    @request_plan
     def create_meta_fact_type_all_bindings(
         self, name, validator_parameter=DEFAULT_METAFACT_VALIDATOR
     ):
@@ -538,7 +972,8 @@ Returns created fact type, or exisiting fact type if it already exists.
 
         # Get all existing fact types
         existing_fact_types = {
-            fact_type.name: fact_type for fact_type in self.get_fact_types()
+            fact_type.name: fact_type
+            for fact_type in (yield from plan(self.get_fact_types))
         }
 
         # Create list bindings for this meta fact type
@@ -551,11 +986,13 @@ Returns created fact type, or exisiting fact type if it already exists.
 
         if name not in existing_fact_types:
             # New meta fact - create fact with bindings to all existing (non meta) fact types
-            fact_type = self.fact_type(
-                name=name,
-                validator_parameter=validator_parameter,
-                relevant_fact_bindings=bindings,
-            ).add()
+            fact_type = yield from plan(
+                self.fact_type(
+                    name=name,
+                    validator_parameter=validator_parameter,
+                    relevant_fact_bindings=bindings,
+                ).add
+            )
 
         else:
             # Fact already exists. Do not create fact, but update bindings
@@ -564,7 +1001,7 @@ Returns created fact type, or exisiting fact type if it already exists.
             fact_type.configure(self.config)
 
             # Add bindings
-            fact_type.add_fact_bindings(bindings)
+            yield from plan(fact_type.add_fact_bindings, bindings)
         return fact_type
 
 
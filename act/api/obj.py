@@ -3,11 +3,15 @@ from logging import info, warning
 import act.api
 
 from . import DEFAULT_OBJECT_VALIDATOR
-from .base import ActBase, ActResultSet, NameSpace
+from .base import ActBase, ActResultSet, NameSpace, Request, request_plan
 from .schema import Field, MissingField, schema_doc
 
 
 class ObjectType(ActBase):
+    __slots__ = ()
+
+    INTERN = True
+
     SCHEMA = [
         Field("name"),
         Field("id"),
@@ -24,9 +28,11 @@ class ObjectType(ActBase):
     def __init__(self, *args, **kwargs):
         super(ObjectType, self).__init__(*args, **kwargs)
 
+    @request_plan
     def add(self):
         params = self.serialize()
-        object_type = self.api_post("v1/objectType", **params)["data"]
+        object_type = (yield Request("POST", "v1/objectType", json=params))["data"]
+        self.invalidate_after_write("v1/objectType")
 
         # Empty data and load new result from response
         self.data = {}
@@ -40,6 +46,8 @@ class ObjectType(ActBase):
 class ObjectStatistics(ActBase):
     """ObjectStatistics - serialized object specifying statistics"""
 
+    __slots__ = ()
+
     SCHEMA = [
         Field("type", deserializer=ObjectType),
         Field("count"),
@@ -61,6 +69,8 @@ class ObjectStatistics(ActBase):
 class Object(ActBase):
     """Manage objects"""
 
+    __slots__ = ()
+
     SCHEMA = [
         Field(
             "type",
@@ -83,6 +93,7 @@ class Object(ActBase):
     def __init__(self, *args, **kwargs):
         super(Object, self).__init__(*args, **kwargs)
 
+    @request_plan
     def facts(self):
         """Get facts"""
 
@@ -95,12 +106,10 @@ class Object(ActBase):
                 "Must have either object ID or object type/value to get facts"
             )
 
-        response = self.api_post(url)
+        response = yield Request("POST", url)
 
-        result_set = ActResultSet(response, act.api.fact.Fact, config=self.config)
-
-        # Add authentication information to all facts
-        return result_set("configure", self.config)
+        # Config (authentication information) is added to all facts
+        return ActResultSet(response, act.api.fact.Fact, config=self.config)
 
     def serialize(self):
         # Return None for empty objects (non initialized objects)
@@ -109,8 +118,10 @@ class Object(ActBase):
         # return default serializer
         return super(Object, self).serialize()
 
-    def traverse(self, query=None):
-        """Traverse from object"""
+    @request_plan
+    def traverse(self, query=None, stream=False):
+        """Traverse from object. If stream is True, the response is decoded
+        incrementally and a StreamingResultSet is returned"""
 
         if self.id:
             url = "v1/object/uuid/{}/traverse".format(self.id)
@@ -121,17 +132,21 @@ class Object(ActBase):
                 "Must have either object ID or object type/value to get facts"
             )
 
+        response = yield Request("POST", url, json={"query": query}, stream=stream)
+
+        if stream:
+            return act.api.base.StreamingResultSet(
+                response, traverse_element, config=self.config
+            )
+
         result = []
-        for element in self.api_post(url, query=query)["data"]:
-            if "inReferenceTo" in element:
-                result.append(act.api.fact.MetaFact(**element).configure(self.config))
-            elif any(["sourceObject" in element, "destinationObject" in element]):
-                result.append(act.api.fact.Fact(**element).configure(self.config))
-            elif "statistics" in element:
-                result.append(act.api.fact.Object(**element).configure(self.config))
-            else:
-                warning("Unable to guess element type: {}".format(element))
-                result.append(element)
+        for element in response["data"]:
+            element = traverse_element(**element)
+
+            if isinstance(element, ActBase):
+                element.configure(self.config)
+
+            result.append(element)
 
         return result
 
@@ -149,3 +164,18 @@ class Object(ActBase):
         """
 
         return "({}/{})".format(self.type.name, self.value)
+
+
+def traverse_element(**element):
+    """Deserialize element from a traverse response to MetaFact, Fact or
+    Object. The element is returned as is if the type is unknown"""
+
+    if "inReferenceTo" in element:
+        return act.api.fact.MetaFact(**element)
+    if any(["sourceObject" in element, "destinationObject" in element]):
+        return act.api.fact.Fact(**element)
+    if "statistics" in element:
+        return Object(**element)
+
+    warning("Unable to guess element type: {}".format(element))
+    return element
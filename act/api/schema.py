@@ -1,7 +1,13 @@
+import contextlib
+import contextvars
 import copy
-import json
+import functools
+import threading
+import weakref
+from collections import OrderedDict
 from logging import info, warning
 
+from .codec import DEFAULT_CODEC
 from .utils import camel_to_snake, snake_to_camel
 
 
@@ -18,6 +24,285 @@ def default_deserializer(value):
     return value
 
 
+# Deserialize nested fields on first access (see lazy_deserialization())
+_LAZY_FIELDS = contextvars.ContextVar("lazy_fields", default=False)
+
+
+@contextlib.contextmanager
+def lazy_deserialization(enabled=True):
+    """Context manager for lazy deserialization of nested fields
+
+    Schema objects created in this context keep nested values (e.g. objects
+    and types in facts) as raw dicts. They are deserialized and cached on
+    first access to the field, or when data is accessed."""
+
+    token = _LAZY_FIELDS.set(enabled)
+    try:
+        yield
+    finally:
+        _LAZY_FIELDS.reset(token)
+
+
+# Interner used for nested fields (see interning())
+_INTERNER = contextvars.ContextVar("interner", default=None)
+
+
+@contextlib.contextmanager
+def interning(interner):
+    """Context manager that interns nested fields of classes with INTERN set,
+    using interner (Interner). Interning is disabled if interner is None"""
+
+    token = _INTERNER.set(interner)
+    try:
+        yield
+    finally:
+        _INTERNER.reset(token)
+
+
+# Cached hashes are stored in the data dict of each Schema object, and are
+# invalidated when the dict is modified. Data of objects that other objects
+# are nested in (parents) is referenced weakly from the nested data, so the
+# hashes of the parents are invalidated as well. Frozen objects can not be
+# modified, so parents are not registered in their data.
+
+
+def _invalidate(data):
+    """Invalidate cached hash in data (SchemaData/FrozenDict) and in the data
+    of all parents"""
+
+    data._hash = None
+
+    parents = getattr(data, "_parents", None)
+
+    if parents:
+        data._parents = None
+
+        if isinstance(parents, weakref.ref):
+            parent = parents()
+            if parent is not None:
+                _invalidate(parent)
+            return
+
+        for parent in list(parents.values()):
+            _invalidate(parent)
+
+
+def _add_parent(value, data):
+    """Register data as parent of value (Schema object or list of Schema
+    objects), so the hash cached in data is invalidated when value changes"""
+
+    if isinstance(value, (list, tuple)):
+        for v in value:
+            _add_parent(v, data)
+        return
+
+    if not isinstance(value, Schema):
+        return
+
+    child = value._data
+
+    if isinstance(child, FrozenDict):
+        return
+
+    parents = getattr(child, "_parents", None)
+
+    # Most objects have one parent, which is referenced with a weakref. Other
+    # parents are kept in a dict, where they are removed when they are
+    # garbage collected
+    if parents is None:
+        child._parents = weakref.ref(data)
+    elif isinstance(parents, weakref.ref):
+        parent = parents()
+        if parent is None:
+            child._parents = weakref.ref(data)
+        elif parent is not data:
+            child._parents = weakref.WeakValueDictionary(
+                {id(parent): parent, id(data): data}
+            )
+    else:
+        parents[id(data)] = data
+
+
+def mutated(obj):
+    """Invalidate cached hash of obj (Schema object) and of all objects obj is
+    nested in"""
+
+    _invalidate(obj._data)
+
+
+def cached_hash(func):
+    """Decorator for __hash__, caching the hash until the Schema object (or an
+    object nested in it) is modified. Modifications of mutable values in data
+    (e.g. appending to a list) are not detected, so mutated() must be called
+    after such changes"""
+
+    @functools.wraps(func)
+    def __hash__(self):
+        value = getattr(self._data, "_hash", None)
+
+        if value is not None:
+            return value
+
+        value = func(self)
+
+        # Data is read after func, since lazy fields may be deserialized
+        data = self._data
+        for child in dict.values(data):
+            _add_parent(child, data)
+
+        data._hash = value
+
+        return value
+
+    return __hash__
+
+
+class SchemaData(dict):
+    """dict holding field values in Schema objects. The hash of the Schema
+    object is cached in the dict, and invalidated when the dict is modified"""
+
+    __slots__ = ("_hash", "_parents", "__weakref__")
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        _invalidate(self)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        _invalidate(self)
+
+    def clear(self):
+        dict.clear(self)
+        _invalidate(self)
+
+    def pop(self, *args):
+        value = dict.pop(self, *args)
+        _invalidate(self)
+        return value
+
+    def popitem(self):
+        value = dict.popitem(self)
+        _invalidate(self)
+        return value
+
+    def setdefault(self, key, default=None):
+        value = dict.setdefault(self, key, default)
+        _invalidate(self)
+        return value
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        _invalidate(self)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        return (SchemaData, (dict(self),))
+
+
+class FrozenDict(dict):
+    """dict that can not be modified, used as data in frozen Schema objects"""
+
+    # Nested objects are not necessarily frozen, so the cached hash may
+    # still be invalidated
+    __slots__ = ("_hash", "__weakref__")
+
+    def _frozen(self, *args, **kwargs):
+        raise TypeError("Frozen (interned) object can not be modified")
+
+    __setitem__ = __delitem__ = _frozen
+    clear = pop = popitem = setdefault = update = _frozen
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class Interner(object):
+    """Bounded (LRU) registry of shared, frozen Schema objects
+
+    Nested values with an id are deserialized once for each distinct value
+    (id, name, namespace and keys), and the same frozen instance is returned
+    for all later occurrences."""
+
+    def __init__(self, maxsize=10000):
+        """
+        Args:
+            maxsize (int):  Maximum number of interned objects
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(schema_cls, value):
+        """Return key for value deserialized with schema_cls, or None if value
+        has no id"""
+
+        if not value.get("id"):
+            return None
+
+        namespace = value.get("namespace")
+
+        if isinstance(namespace, dict):
+            namespace = (namespace.get("id"), namespace.get("name"))
+
+        return (schema_cls, value["id"], value.get("name"), namespace, tuple(value))
+
+    def intern(self, schema_cls, value):
+        """Return shared, frozen instance of schema_cls deserialized from
+        value (dict)"""
+
+        key = self.key(schema_cls, value)
+
+        if key is None:
+            return schema_cls(**value)
+
+        with self._lock:
+            obj = self._entries.get(key)
+
+            if obj is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return obj
+
+        obj = schema_cls(**value).freeze()
+
+        with self._lock:
+            # Another thread may have interned the same value
+            obj = self._entries.setdefault(key, obj)
+            self._entries.move_to_end(key)
+            self.misses += 1
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return obj
+
+    def clear(self):
+        """Remove all interned objects"""
+
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_entries"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
 class ValidationError(Exception):
     def __init__(self, *args, **kwargs):
         Exception.__init__(self, *args, **kwargs)
@@ -78,6 +363,11 @@ class Field(object):
                     )
                 )
 
+            interner = _INTERNER.get()
+
+            if interner is not None and getattr(self.deserializer, "INTERN", False):
+                return interner.intern(self.deserializer, value)
+
             return self.deserializer(**value)
 
         return self.deserializer(value)
@@ -118,12 +408,116 @@ The following arguments can be specified by position or keyword.
 
 # pylint: disable=useless-object-inheritance
 class Schema(object):
-    """Define schema and serialize/deserialize response from the platform"""
+    """Define schema and serialize/deserialize response from the platform
+
+    Field values are stored in the data dict. Instances use __slots__ to
+    avoid a __dict__ per instance, so subclasses should define __slots__
+    (an empty tuple unless they add attributes)."""
+
+    __slots__ = ("_data", "_pending")
+
+    # Slots included when pickled/copied. The cached hash (in data) is not
+    # pickled, since hashes of strings are not the same in other processes
+    _state_slots = ("_data", "_pending")
+
+    # Nested values of this class are interned (see Interner)
+    INTERN = False
+
+    # Lookup tables built from SCHEMA when the class is created
+    _fields = {}  # name -> field
+    _deserialize_fields = {}  # name -> field data is deserialized to
+    _serialize_fields = {}  # name -> field data is serialized from
+    _serialize_targets = []  # (field, key, camelCase key in serialized data)
+    _deserialize_keys = {}  # key in data (camelCase/snake_case) -> field name
+    _default_fields = []  # fields set to default if not deserialized
+
+    # Generated functions (see compile_serializer/compile_deserializer)
+    _serialize_compiled = None
+    _deserialize_compiled = None
+
+    def __init_subclass__(cls, **kwargs):
+        """Build field lookup tables for SCHEMA in subclass"""
+
+        super().__init_subclass__(**kwargs)
+
+        # Cache hash if defined in subclass
+        if cls.__dict__.get("__hash__") is not None:
+            cls.__hash__ = cached_hash(cls.__dict__["__hash__"])
+
+        cls._state_slots = tuple(
+            slot
+            for klass in reversed(cls.__mro__)
+            for slot in klass.__dict__.get("__slots__", ())
+            if slot not in ("__dict__", "__weakref__")
+        )
+
+        schema = getattr(cls, "SCHEMA", [])
+
+        fields = {}
+        for field in schema:
+            # First field wins if the name is used more than once
+            fields.setdefault(field.name, field)
+
+        cls._fields = fields
+
+        cls._deserialize_fields = {
+            name: fields.get(field.deserialize_target)
+            if field.deserialize_target
+            else field
+            for name, field in fields.items()
+        }
+
+        cls._serialize_fields = {
+            name: fields.get(field.serialize_target)
+            if field.serialize_target
+            else field
+            for name, field in fields.items()
+        }
+
+        cls._serialize_targets = [
+            (
+                field,
+                field.serialize_target or field.name,
+                snake_to_camel(field.serialize_target or field.name),
+            )
+            for field in schema
+        ]
+
+        # Translation of all known keys, so camel_to_snake() is only used
+        # for keys not in the schema
+        cls._deserialize_keys = {
+            key: camel_to_snake(key)
+            for name in fields
+            for key in (name, snake_to_camel(name))
+        }
+
+        # Set default value for all fields, unless any of
+        # - field is deseriazlied with another key
+        # - field is flattened
+        # - deserializer is disabled
+        cls._default_fields = [
+            field
+            for field in schema
+            if not field.deserialize_target
+            and not field.flatten
+            and field.deserializer is not False
+        ]
+
+        if hasattr(cls, "SCHEMA"):
+            cls._serialize_compiled = compile_serializer(cls)
+            cls._deserialize_compiled = compile_deserializer(cls)
+
+        # Attribute access to fields. Names that are already defined on the
+        # class (e.g. methods, or fields in a parent class) are not replaced
+        for name in fields:
+            if not hasattr(cls, name):
+                setattr(cls, name, compile_attribute(name))
 
     def __init__(self, *args, **kwargs):
         """Initialize (deserialize) fields"""
 
-        self.data = {}
+        object.__setattr__(self, "_data", SchemaData())
+        object.__setattr__(self, "_pending", None)
 
         # Apply all positinal arguments based on order in SCHEMA
         for i, v in enumerate(args):
@@ -131,18 +525,25 @@ class Schema(object):
 
         self.deserialize(**kwargs)
 
-    def json(self, exclude_none=True, to_camel_case=True):
-        return json.dumps(
+    def json(self, exclude_none=True, to_camel_case=True, codec=None):
+        """Serialize to JSON using codec (act.api.codec.JSONCodec). The
+        json module in the standard library is used if codec is not set"""
+
+        return (codec or DEFAULT_CODEC).dumps(
             self.serialize(exclude_none=exclude_none, to_camel_case=to_camel_case)
         )
 
     def serialize(self, exclude_none=True, to_camel_case=True):
-        entries = {}
-        for field in self.SCHEMA:
-            serialize_target = field.serialize_target or field.name
+        if self._serialize_compiled:
+            return self._serialize_compiled(exclude_none, to_camel_case)
 
+        return self._serialize_generic(exclude_none, to_camel_case)
+
+    def _serialize_generic(self, exclude_none=True, to_camel_case=True):
+        entries = {}
+        for field, serialize_target, camel_target in self._serialize_targets:
             if to_camel_case:
-                serialize_target = snake_to_camel(serialize_target)
+                serialize_target = camel_target
 
             # Entry is stored in another field internally
             value = self.data.get(field.name, None)
@@ -163,36 +564,155 @@ class Schema(object):
         return entries
 
     def get_field(self, name):
-        for field in self.SCHEMA:
-            if name == field.name:
-                return field
-        return None
+        return self._fields.get(name)
 
     def get_deserialize_field(self, name):
-        field = self.get_field(name)
+        return self._deserialize_fields.get(name)
 
-        if not field:
-            return None
+    def get_serialize_field(self, name):
+        return self._serialize_fields.get(name)
 
-        if field.deserialize_target:
-            return self.get_field(field.deserialize_target)
-        return field
+    @property
+    def data(self):
+        """Field values. Lazy fields are deserialized before data is returned"""
 
-    def get_serialize_field(self, name):
-        field = self.get_field(name)
+        if self._pending:
+            for name in list(self._pending):
+                self._materialize(name)
 
-        if not field:
-            return None
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        if isinstance(getattr(self, "_data", None), FrozenDict):
+            raise TypeError("Frozen (interned) object can not be modified")
+
+        if not isinstance(value, SchemaData):
+            value = SchemaData(value)
+
+        # Invalidate hashes of objects this object is nested in
+        old = getattr(self, "_data", None)
+        if old is not None:
+            _invalidate(old)
+
+        self._data = value
+        self._pending = None
+
+    @property
+    def frozen(self):
+        """True if object is frozen (immutable)"""
+
+        return isinstance(self._data, FrozenDict)
+
+    def freeze(self):
+        """Make object immutable. Returns self"""
+
+        # Parents are registered in the old data
+        _invalidate(self._data)
+
+        self._data = FrozenDict(self.data)
+        self._pending = None
+        return self
+
+    def clone(self):
+        """Return a copy of the object, which is cheaper than copy.deepcopy().
+
+        Nested objects are cloned, except frozen (interned) objects, which are
+        shared with the copy. Attributes that are not fields (e.g. config) are
+        shared as well."""
+
+        clone = self.__class__.__new__(self.__class__)
+
+        for slot in self._state_slots:
+            try:
+                object.__setattr__(clone, slot, object.__getattribute__(self, slot))
+            except AttributeError:
+                pass  # Slot is not set
+
+        if hasattr(self, "__dict__"):
+            clone.__dict__.update(self.__dict__)
+
+        data = SchemaData()
+        for name, value in dict.items(self._data):
+            dict.__setitem__(data, name, _clone_value(value))
+
+        object.__setattr__(clone, "_data", data)
+        object.__setattr__(clone, "_pending", set(self._pending or ()) or None)
+
+        return clone
+
+    def _materialize(self, name):
+        """Deserialize lazy field"""
+
+        field = self._fields[name]
+        value = self._data[name]
+
+        # Nested fields in the deserialized value are lazy as well
+        token = _LAZY_FIELDS.set(True)
+        try:
+            if isinstance(value, (list, tuple)):
+                value = [field.deserialize(v) for v in value]
+            else:
+                value = field.deserialize(value)
+        finally:
+            _LAZY_FIELDS.reset(token)
+
+        # Value is the same, so cached hashes are still valid
+        dict.__setitem__(self._data, name, value)
+        self._pending.discard(name)
+
+    @classmethod
+    def deserialize_batch(cls, entries, **attributes):
+        """Deserialize entries (list of dicts) to a list of objects, with
+        the same result as [cls(**entry) for entry in entries]. Attributes
+        (e.g. config) are set on all objects.
+
+        The objects are created without calling __init__, so subclasses that
+        set attributes in __init__ must set them in deserialize_batch."""
+
+        deserialize_compiled = cls._deserialize_compiled
+        lazy = _LAZY_FIELDS.get()
+        objects = []
+
+        for entry in entries:
+            obj = cls.__new__(cls)
+            object.__setattr__(obj, "_data", SchemaData())
+            object.__setattr__(obj, "_pending", None)
+
+            for name, value in attributes.items():
+                object.__setattr__(obj, name, value)
 
-        if field.serialize_target:
-            return self.get_field(field.serialize_target)
+            if lazy or not deserialize_compiled or not deserialize_compiled(obj, entry):
+                obj._deserialize_generic(**entry)
 
-        return field
+            objects.append(obj)
+
+        return objects
 
     def deserialize(self, **entries):
+        if (
+            self._deserialize_compiled
+            and not self._pending
+            and not _LAZY_FIELDS.get()
+            and self._deserialize_compiled(entries)
+        ):
+            _invalidate(self._data)
+            return
+
+        self._deserialize_generic(**entries)
+
+    def _deserialize_generic(self, **entries):
+        deserialize_fields = self._deserialize_fields
+        deserialize_keys = self._deserialize_keys
+        data = self._data
+        lazy = _LAZY_FIELDS.get()
+
+        # Bypass SchemaData, cached hash is invalidated once when done
+        setitem = dict.__setitem__
+
         for k, value in entries.items():
-            k = camel_to_snake(k)
-            field = self.get_deserialize_field(k)
+            k = deserialize_keys.get(k) or camel_to_snake(k)
+            field = deserialize_fields.get(k)
 
             if not field:
                 warning('"{}" not defined in schema on {}'.format(k, self.__class__))
@@ -206,54 +726,68 @@ class Schema(object):
                 self.deserialize(**value)
                 continue
 
+            if (
+                lazy
+                and field.deserializer is not default_deserializer
+                and isinstance(value, (dict, list, tuple))
+            ):
+                # Keep raw value until field is accessed
+                setitem(data, field.name, value)
+
+                if self._pending is None:
+                    self._pending = set()
+                self._pending.add(field.name)
+                continue
+
+            if self._pending:
+                self._pending.discard(field.name)
+
             if isinstance(value, (list, tuple)):
-                self.data[field.name] = [field.deserialize(v) for v in value]
+                setitem(data, field.name, [field.deserialize(v) for v in value])
             else:
-                self.data[field.name] = field.deserialize(value)
+                setitem(data, field.name, field.deserialize(value))
 
         if not hasattr(self, "SCHEMA"):
             raise ValidationError(
                 "No SCHEMA defined in class {}".format(self.__class__)
             )
 
-        for field in self.SCHEMA:
-            # Loop through all fields and set default value, unless any of
-            # - field is deseriazlied with another key
-            # - field is flattened
-            # - deserializer is disabled
-            if (
-                field.name not in self.data
-                and not field.deserialize_target
-                and not field.flatten
-                and field.deserializer is not False
-            ):
-                self.data[field.name] = copy.copy(field.default)
+        for field in self._default_fields:
+            if field.name not in data:
+                setitem(data, field.name, copy.copy(field.default))
+
+        _invalidate(data)
 
     def __getitem__(self, key):
-        return self.data[key]
+        if self._pending and key in self._pending:
+            self._materialize(key)
+
+        return self._data[key]
 
     def __getattr__(self, attr):
         """
-        Get attribute from schema
+        Get attribute from schema. Fields are accessed through properties
+        (see compile_attribute), so this is only used for other keys in data
         """
-        if attr in self.__dict__.get("data", {}):
-            return self.__dict__["data"][attr]
+        # data is not set yet (e.g. while unpickling)
+        if attr not in ("data", "_data", "_pending") and attr in self._data:
+            return self[attr]
 
         raise AttributeError(
             # pylint: disable=too-many-format-args
             "{} object has no attribute {}".format(self.__class__, attr)
         )
 
-    def __setattr__(self, attr, value):
-        """
-        Set schema attribute
-        """
+    def __getstate__(self):
+        slots = {}
+
+        for slot in self._state_slots:
+            try:
+                slots[slot] = object.__getattribute__(self, slot)
+            except AttributeError:
+                pass  # Slot is not set
 
-        # If attribute is in schema, update schema
-        if attr in self.__dict__.get("data", {}):
-            self.__dict__["data"][attr] = value
-        else:  # If not, set attribute on object directly
-            self.__dict__[attr] = value
+        return (getattr(self, "__dict__", None), slots)
 
     def __eq__(self, other):
         if not isinstance(other, self.__class__):
@@ -296,3 +830,298 @@ class Schema(object):
             args.append("{}={!r}".format(field.name, value))
 
         return "{}({})".format(self.__class__.__name__, ", ".join(args))
+
+
+# Generated serializers/deserializers
+#
+# Schema.serialize() and Schema.deserialize() interpret the field flags for
+# every field of every record. The functions below generate specialized code
+# for each Schema subclass, with the field logic unrolled. The generated
+# functions give the same result as the generic implementation, which is
+# still used when the generated code does not apply.
+
+# Values that are serialized/deserialized as is (except str, which is trimmed)
+_SCALARS = (int, float, bool, type(None))
+
+# Values that are serialized as is
+_PLAIN = (str, int, float, bool, type(None))
+
+# Marker for keys that are not in entries
+_MISSING = object()
+
+
+def _field_value(field, value):
+    """Deserialize value (or list of values) with field"""
+
+    if isinstance(value, (list, tuple)):
+        return [field.deserialize(v) for v in value]
+
+    return field.deserialize(value)
+
+
+def _compile(source, name, namespace):
+    namespace.update(
+        {
+            "_MISSING": _MISSING,
+            "_PLAIN": _PLAIN,
+            "_SCALARS": _SCALARS,
+            "_INTERNER": _INTERNER,
+            "_field_value": _field_value,
+            "camel_to_snake": camel_to_snake,
+            "copy": copy,
+            "info": info,
+            "warning": warning,
+        }
+    )
+
+    exec(compile(source, "<schema {}>".format(name), "exec"), namespace)  # nosec
+
+    return namespace[name]
+
+
+def compile_deserializer(cls):
+    """Generate function deserializing entries (dict) into an object of cls,
+    or None if the schema is not supported.
+
+    The function returns False without modifying the object if entries
+    contain keys that need the generic implementation (keys deserialized to
+    another field, flattened fields or the same field given in both camelCase
+    and snake_case)."""
+
+    lines = ["def deserialize(self, entries):", "    get = entries.get"]
+    body = []
+    namespace = {"KNOWN": set(), "CLS": cls}
+    found = []
+    default_fields = set(field.name for field in cls._default_fields)
+
+    if any(getattr(field.deserializer, "INTERN", False) for field in cls.SCHEMA):
+        body.append("    interner = _INTERNER.get()")
+
+    for i, (name, field) in enumerate(cls._fields.items()):
+        if field.deserialize_target or field.flatten:
+            continue
+
+        # All keys deserialized to this field (camelCase and snake_case)
+        keys = sorted(
+            (key for key, target in cls._deserialize_keys.items() if target == name),
+            key=lambda key: key == name,
+        )
+
+        if not keys:
+            return None  # Key can not be translated to field name
+
+        namespace["KNOWN"].update(keys)
+
+        lines.append("    v{} = get({!r}, _MISSING)".format(i, keys[0]))
+        for key in keys[1:]:
+            lines.append("    if v{0} is _MISSING:".format(i))
+            lines.append("        v{} = get({!r}, _MISSING)".format(i, key))
+            # Same field as both camelCase and snake_case
+            lines.append("    elif {!r} in entries:".format(key))
+            lines.append("        return False")
+
+        found.append("(v{} is not _MISSING)".format(i))
+
+        if field.deserializer is False:
+            continue  # Deserializer disabled, value is ignored
+
+        namespace["F{}".format(i)] = field
+        namespace["D{}".format(i)] = field.deserializer
+        namespace["DEFAULT{}".format(i)] = field.default
+
+        body.append("    v = v{}".format(i))
+        body.append("    if v is not _MISSING:")
+
+        if field.deserializer is default_deserializer:
+            body.extend(
+                [
+                    "        if v.__class__ is str:",
+                    "            t = v.strip()",
+                    "            if t != v:",
+                    "                info('Value was trimmed: \"{}\"'.format(v))",
+                    "            values[{!r}] = t".format(name),
+                    "        elif v.__class__ in _SCALARS:",
+                    "            values[{!r}] = v".format(name),
+                    "        else:",
+                    "            values[{!r}] = _field_value(F{}, v)".format(name, i),
+                ]
+            )
+        elif isinstance(field.deserializer, type) and issubclass(
+            field.deserializer, Schema
+        ):
+            body.append("        if v.__class__ is dict:")
+
+            if field.deserializer.INTERN:
+                body.extend(
+                    [
+                        "            if interner is not None:",
+                        "                values[{!r}] = interner.intern(D{}, v)".format(
+                            name, i
+                        ),
+                        "            else:",
+                        "                values[{!r}] = D{}(**v)".format(name, i),
+                    ]
+                )
+            else:
+                body.append("            values[{!r}] = D{}(**v)".format(name, i))
+
+            body.extend(
+                [
+                    "        else:",
+                    "            values[{!r}] = _field_value(F{}, v)".format(name, i),
+                ]
+            )
+        else:
+            body.append("        values[{!r}] = _field_value(F{}, v)".format(name, i))
+
+        if name in default_fields:
+            body.append("    elif {!r} not in data:".format(name))
+
+            if isinstance(field.default, _PLAIN):
+                body.append("        values[{!r}] = DEFAULT{}".format(name, i))
+            else:
+                body.append(
+                    "        values[{!r}] = copy.copy(DEFAULT{})".format(name, i)
+                )
+
+    # Keys not handled here. Keys not in the schema are ignored, as in
+    # the generic implementation, other keys are left to it
+    lines.extend(
+        [
+            "    if {} != len(entries):".format(" + ".join(found) if found else "0"),
+            "        unknown = [camel_to_snake(k) for k in entries if k not in KNOWN]",
+            "        if any(k in CLS._deserialize_fields for k in unknown):",
+            "            return False",
+            "        for k in unknown:",
+            "            warning('\"{}\" not defined in schema on {}'.format(k, CLS))",
+        ]
+    )
+
+    # Values are collected in a plain dict and written to data (SchemaData)
+    # in one update, bypassing SchemaData.__setitem__
+    lines.extend(["    data = self._data", "    values = {}"])
+    lines.extend(body)
+    lines.extend(["    dict.update(data, values)", "    return True"])
+
+    return _compile("\n".join(lines), "deserialize", namespace)
+
+
+def compile_serializer(cls):
+    """Generate function serializing an object of cls, with the same
+    arguments as Schema.serialize()"""
+
+    lines = [
+        "def serialize(self, exclude_none=True, to_camel_case=True):",
+        "    get = self.data.get",
+        "    entries = {}",
+    ]
+    namespace = {}
+
+    for i, (field, target, camel_target) in enumerate(cls._serialize_targets):
+        if field.serializer is False:
+            continue
+
+        namespace["F{}".format(i)] = field
+        namespace["S{}".format(i)] = field.serializer
+
+        key = "({!r} if to_camel_case else {!r})".format(camel_target, target)
+
+        lines.append("    v = get({!r})".format(field.name))
+        lines.append("    if v is not None or not exclude_none:")
+
+        if field.serializer:
+            lines.extend(
+                [
+                    "        if isinstance(v, (list, tuple)):",
+                    "            entries[{}] = [S{}(x) for x in v]".format(key, i),
+                    "        else:",
+                    "            entries[{}] = S{}(v)".format(key, i),
+                ]
+            )
+        else:
+            lines.extend(
+                [
+                    "        if v.__class__ in _PLAIN:",
+                    "            entries[{}] = v".format(key),
+                    "        elif isinstance(v, (list, tuple)):",
+                    "            entries[{}] = [F{}.serialize(x) for x in v]".format(
+                        key, i
+                    ),
+                    "        else:",
+                    "            entries[{}] = F{}.serialize(v)".format(key, i),
+                ]
+            )
+
+    lines.append("    return entries")
+
+    return _compile("\n".join(lines), "serialize", namespace)
+
+
+def _clone_value(value):
+    """Copy value for Schema.clone()"""
+
+    if value.__class__ in _PLAIN:
+        return value
+
+    if isinstance(value, Schema):
+        if value.frozen:
+            return value
+        return value.clone()
+
+    if isinstance(value, list):
+        return [_clone_value(v) for v in value]
+
+    if isinstance(value, tuple):
+        return tuple(_clone_value(v) for v in value)
+
+    return copy.deepcopy(value)
+
+
+def compile_attribute(name):
+    """Generate property for field name, reading and writing the value in
+    data. An AttributeError is raised if the field is not in data, as for
+    other attributes that are not set.
+
+    Values that are not in data can be set on objects with a __dict__
+    (subclasses without __slots__), as for other attributes."""
+
+    source = """
+def get(self):
+    try:
+        value = self._data[NAME]
+    except KeyError:
+        try:
+            return self.__dict__[NAME]
+        except (AttributeError, KeyError):
+            raise AttributeError(NAME) from None
+
+    if self._pending and NAME in self._pending:
+        self._materialize(NAME)
+        return self._data[NAME]
+
+    return value
+
+
+def set(self, value):
+    try:
+        data = self._data
+    except AttributeError:
+        data = {}
+
+    if NAME in data:
+        data[NAME] = value
+
+        if self._pending:
+            self._pending.discard(NAME)
+    elif hasattr(self, "__dict__"):
+        self.__dict__[NAME] = value
+    else:
+        raise AttributeError(
+            "{} object has no attribute {}".format(self.__class__, NAME)
+        )
+""".replace("NAME", repr(name))
+
+    namespace = {}
+    _compile(source, "get", namespace)
+
+    return property(namespace["get"], namespace["set"])
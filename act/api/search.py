@@ -0,0 +1,185 @@
+"""Parallel search of a time range
+
+A search returns at most 10000 results, so large time ranges have to be
+searched in smaller time windows (shards). sharded_search() searches the
+shards concurrently and splits shards that are not complete into smaller
+shards, based on how many results (count) the shard has."""
+
+import datetime
+import math
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from logging import debug, warning
+
+from act.api.utils import format_timestamp, parse_timestamp
+
+MAX_LIMIT = 10000  # Max limit supported by the API
+
+# Timestamps have millisecond resolution, so shards are not split further
+MIN_SHARD = datetime.timedelta(milliseconds=1)
+
+# Max number of shards a shard is split into at once
+MAX_SPLIT = 64
+
+
+def split_shard(start, end, parts):
+    """Split shard (start, end) into parts of equal length, most recent first.
+    Shards are not split into parts shorter than MIN_SHARD"""
+
+    parts = max(1, min(parts, (end - start) // MIN_SHARD))
+    length = (end - start) / parts
+
+    bounds = [start + length * i for i in range(parts)] + [end]
+
+    # Round to milliseconds, since shards are searched with millisecond
+    # timestamps
+    bounds = [
+        bound.replace(microsecond=bound.microsecond // 1000 * 1000)
+        for bound in bounds
+    ]
+
+    return [
+        (bounds[i - 1], bounds[i])
+        for i in range(len(bounds) - 1, 0, -1)
+        if bounds[i - 1] < bounds[i]
+    ]
+
+
+def sharded_search(
+    search,
+    timestamp,
+    after,
+    before=None,
+    workers=10,
+    limit=MAX_LIMIT,
+    ordered=True,
+    partition=True,
+):
+    """Search time range from after to before in concurrent shards and yield
+    all results
+
+    Args:
+        search (function):    Function returning ActResultSet for keyword
+                              arguments after, before and limit
+        timestamp (function): Function returning timestamp of result, called
+                              as timestamp(result, before)
+        after (timestamp):    Start of time range (2016-09-28T21:26:22Z)
+        before (timestamp):   End of time range (default now)
+        workers (int):        Number of concurrent searches
+        limit (int):          Limit in each search
+        ordered (bool):       Yield results ordered by timestamp, most recent
+                              first. Otherwise results are yielded as soon as
+                              their shard is complete
+        partition (bool):     Results are in the shard of their timestamp
+                              (facts). Otherwise results can be returned in more
+                              than one shard (objects), and duplicates are
+                              dropped by ID
+
+    Shards that are not complete (size < count) are split into
+    ceil(count / size) + 1 shards of equal length, and their results are
+    dropped. Shards that can not be split further are yielded incomplete,
+    with a warning.
+    """
+
+    # Timestamps are parsed to naive datetimes in UTC (see parse_timestamp)
+    start = parse_timestamp(after)
+    end = (
+        parse_timestamp(before)
+        if before
+        else datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    )
+
+    def fetch(shard):
+        # after/before may be inclusive or exclusive, so the search includes
+        # both boundaries and results are filtered by shard
+        return search(
+            after=format_timestamp(shard[0] - MIN_SHARD),
+            before=format_timestamp(shard[1]),
+            limit=limit,
+        )
+
+    def shard_results(shard, result_set):
+        shard_start = format_timestamp(shard[0])
+        shard_end = format_timestamp(shard[1])
+
+        results = []
+        for result in result_set:
+            result_timestamp = timestamp(result, shard_end)
+
+            if result_timestamp:
+                result_timestamp = format_timestamp(parse_timestamp(result_timestamp))
+
+                if partition and not shard_start <= result_timestamp < shard_end:
+                    continue
+
+            results.append((result_timestamp or "", result))
+
+        if ordered:
+            results.sort(key=lambda result: result[0], reverse=True)
+
+        return [result for _, result in results]
+
+    seen = set()
+    order = split_shard(start, end, 1)  # Shards not yielded yet, most recent first
+    done = {}  # shard -> results
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch, shard): shard for shard in order}
+
+        try:
+            while futures:
+                completed, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+                for future in completed:
+                    shard = futures.pop(future)
+                    result_set = future.result()
+
+                    if not result_set.complete:
+                        parts = math.ceil(result_set.count / (result_set.size or limit))
+                        shards = split_shard(*shard, min(parts + 1, MAX_SPLIT))
+
+                        if len(shards) > 1:
+                            debug(
+                                "Splitting shard %s-%s (count=%s) in %s",
+                                *shard,
+                                result_set.count,
+                                len(shards),
+                            )
+
+                            i = order.index(shard)
+                            order[i : i + 1] = shards
+
+                            for sub_shard in shards:
+                                futures[executor.submit(fetch, sub_shard)] = sub_shard
+                            continue
+
+                        warning(
+                            "Shard %s-%s is not complete (size=%s, count=%s)",
+                            *shard,
+                            result_set.size,
+                            result_set.count,
+                        )
+
+                    done[shard] = shard_results(shard, result_set)
+
+                # Yield results of shards that are done. If ordered, only
+                # when all more recent shards are yielded
+                if ordered:
+                    ready = []
+                    while order and order[0] in done:
+                        ready.append(order.pop(0))
+                else:
+                    ready = list(done)
+                    for shard in ready:
+                        order.remove(shard)
+
+                for shard in ready:
+                    for result in done.pop(shard):
+                        if not partition:
+                            if result.id in seen:
+                                continue
+                            seen.add(result.id)
+
+                        yield result
+        finally:
+            for future in futures:
+                future.cancel()
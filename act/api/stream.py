@@ -0,0 +1,147 @@
+"""Incremental decoding of JSON responses
+
+The ACT API returns results as a JSON object, where the entries are in an
+array under "data". iter_json_object() decodes such a response from a stream
+of chunks, yielding each entry in the array as soon as it is decoded, so the
+full response is never held in memory."""
+
+import codecs
+import json
+
+# Events emitted from iter_json_object()
+KEY = "key"  # Top level key/value
+ARRAY_START = "array_start"  # Start of array being streamed
+ITEM = "item"  # Entry in array being streamed
+
+WHITESPACE = " \t\n\r"
+
+_decoder = json.JSONDecoder()
+
+
+class IncompleteJSON(ValueError):
+    """JSON stream ended before the JSON object was complete"""
+
+
+class _Buffer(object):
+    """Text buffer filled from an iterator of chunks (bytes or str)"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text = ""
+        self.pos = 0
+        self.exhausted = False
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    def fill(self):
+        """Read next chunk. Returns False if there are no more chunks"""
+
+        for chunk in self.chunks:
+            if isinstance(chunk, bytes):
+                chunk = self.utf8.decode(chunk)
+
+            if chunk:
+                # Drop text that is already consumed
+                self.text = self.text[self.pos :] + chunk
+                self.pos = 0
+                return True
+
+        self.exhausted = True
+        return False
+
+    def peek(self):
+        """Skip whitespace and return next character (None at end of stream)"""
+
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+
+            if not self.fill():
+                return None
+
+    def expect(self, chars):
+        """Consume next character, which must be one of chars"""
+
+        char = self.peek()
+
+        if char is None:
+            raise IncompleteJSON("Unexpected end of JSON stream")
+
+        if char not in chars:
+            raise ValueError(
+                "Expected one of {!r} at position {}, got {!r}".format(
+                    chars, self.pos, char
+                )
+            )
+
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode next JSON value"""
+
+        if self.peek() is None:
+            raise IncompleteJSON("Unexpected end of JSON stream")
+
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.text) and not self.exhausted and self.fill():
+                continue
+
+            self.pos = end
+            return value
+
+
+def iter_json_object(chunks, stream_key="data"):
+    """Decode a JSON object from chunks (bytes or str) and yield events
+
+    Yields tuples of (event, key, value):
+        ("key", key, value):                Top level key, except stream_key
+        ("array_start", stream_key, None):  Start of the array in stream_key
+        ("item", stream_key, value):        Each entry in the array in stream_key
+
+    If stream_key is not an array (e.g. null), it is yielded as a "key" event.
+    """
+
+    buf = _Buffer(chunks)
+
+    buf.expect("{")
+
+    if buf.peek() == "}":
+        buf.pos += 1
+        return
+
+    while True:
+        key = buf.value()
+
+        if not isinstance(key, str):
+            raise ValueError("Expected string as object key, got {!r}".format(key))
+
+        buf.expect(":")
+
+        if key == stream_key and buf.peek() == "[":
+            buf.pos += 1
+            yield (ARRAY_START, key, None)
+
+            if buf.peek() == "]":
+                buf.pos += 1
+            else:
+                while True:
+                    yield (ITEM, key, buf.value())
+
+                    if buf.expect(",]") == "]":
+                        break
+        else:
+            yield (KEY, key, buf.value())
+
+        if buf.expect(",}") == "}":
+            return
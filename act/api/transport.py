@@ -0,0 +1,698 @@
+"""Transport policies used when sending requests to the ACT API"""
+
+import fnmatch
+import random
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict, namedtuple
+from logging import debug, info, warning
+
+from .utils import snake_to_camel
+
+# Number of retries and seconds spent sleeping between retries for one call
+RetryStats = namedtuple("RetryStats", ["retries", "sleep_time"])
+
+# Response cache statistics
+CacheStats = namedtuple(
+    "CacheStats", ["hits", "misses", "entries", "bytes", "evictions", "invalidations"]
+)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half-open"
+
+
+class RetryPolicy(object):
+    """Retry policy with exponential backoff, jitter and a retry budget
+
+    The retry budget is shared by all requests using the policy. It holds at
+    most `budget` retries, and each request sent adds `budget_ratio` retries
+    back to the budget. This makes sure that retries are limited to a fraction
+    of the traffic when the backend is overloaded."""
+
+    def __init__(
+        self,
+        max_retries=3,
+        backoff_factor=0.5,
+        max_backoff=30.0,
+        jitter=True,
+        budget=10.0,
+        budget_ratio=0.1,
+    ):
+        """
+        Args:
+            max_retries (int):        Maximum number of retries per request
+            backoff_factor (float):   Backoff before first retry (seconds). The
+                                      backoff is doubled for each retry
+            max_backoff (float):      Maximum backoff between two retries (seconds)
+            jitter (bool):            Sleep a random time between zero and the
+                                      backoff (full jitter)
+            budget (float):           Maximum number of retries available in the
+                                      retry budget
+            budget_ratio (float):     Retries added to the budget for each request
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.budget = budget
+        self.budget_ratio = budget_ratio
+
+        self.tokens = float(budget)
+        self.retries = 0
+        self.sleep_time = 0.0
+        self.budget_exhausted = 0
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def backoff(self, retry):
+        """Return seconds to sleep before retry number `retry` (starting at 0)"""
+
+        delay = min(self.max_backoff, self.backoff_factor * (2**retry))
+
+        if self.jitter:
+            return random.uniform(0, delay)
+
+        return delay
+
+    def request_sent(self):
+        """Add to the retry budget for each request that is sent"""
+
+        with self._lock:
+            self.tokens = min(self.budget, self.tokens + self.budget_ratio)
+
+    def acquire(self, retry):
+        """Return True if retry number `retry` (starting at 0) is allowed.
+        An allowed retry is withdrawn from the retry budget"""
+
+        if retry >= self.max_retries:
+            return False
+
+        with self._lock:
+            if self.tokens < 1:
+                self.budget_exhausted += 1
+                return False
+
+            self.tokens -= 1
+
+        return True
+
+    def report(self, retries, sleep_time):
+        """Record retries and time spent sleeping for one call"""
+
+        self._local.last_call = RetryStats(retries, sleep_time)
+
+        with self._lock:
+            self.retries += retries
+            self.sleep_time += sleep_time
+
+    @property
+    def last_call(self):
+        """RetryStats for the last call made by the current thread"""
+
+        return getattr(self._local, "last_call", RetryStats(0, 0.0))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+
+        # Locks can not be pickled
+        del state["_lock"]
+        del state["_local"]
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+
+class TokenBucket(object):
+    """Thread safe token bucket"""
+
+    def __init__(self, rate, burst=None):
+        """
+        Args:
+            rate (float):   Tokens added per second
+            burst (int):    Maximum number of tokens in the bucket (default=rate)
+        """
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token from the bucket and return the number of seconds to
+        wait before the token is available"""
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+
+            # Tokens can become negative, so concurrent callers queue up
+            # behind each other
+            self.tokens -= 1
+
+            if self.tokens >= 0:
+                return 0.0
+
+            return -self.tokens / self.rate
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class RateLimiter(object):
+    """Client side rate limiter for requests towards the API
+
+    Requests are limited by a global token bucket and optionally by a token
+    bucket for the endpoint. Endpoints are matched against the end of the URL
+    path and may contain wildcards, e.g. "v1/fact", "v1/fact/search" or
+    "v1/fact/uuid/*/meta". The most specific (longest) endpoint is used if
+    several endpoints match."""
+
+    def __init__(self, rate=None, burst=None, endpoints=None):
+        """
+        Args:
+            rate (float):       Requests per second for all requests (None=unlimited)
+            burst (int):        Number of requests allowed in a burst (default=rate)
+            endpoints (dict):   Limits per endpoint, either requests per second or
+                                a (rate, burst) tuple. E.g.
+                                {"v1/fact": 50, "v1/fact/search": (5, 10)}
+        """
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.endpoints = {}
+
+        for endpoint, limit in (endpoints or {}).items():
+            if not isinstance(limit, (list, tuple)):
+                limit = (limit,)
+            self.endpoints[endpoint.strip("/")] = TokenBucket(*limit)
+
+        # Match most specific endpoints first
+        self._patterns = sorted(self.endpoints, key=len, reverse=True)
+
+        self.requests = 0
+        self.wait_time = 0.0
+        self.endpoint_wait_time = {endpoint: 0.0 for endpoint in self.endpoints}
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def endpoint(self, url):
+        """Return the endpoint limit matching url (or None)"""
+
+        path = urllib.parse.urlparse(url).path.rstrip("/")
+
+        for pattern in self._patterns:
+            if fnmatch.fnmatchcase(path, "*/" + pattern):
+                return pattern
+
+        return None
+
+    def acquire(self, url):
+        """Wait until a request to url is allowed. Returns seconds waited"""
+
+        wait = self.reserve(url)
+
+        if wait:
+            time.sleep(wait)
+
+        return wait
+
+    def reserve(self, url):
+        """Reserve a request to url and return the number of seconds to wait
+        before it is sent (used by callers that can not block)"""
+
+        endpoint = self.endpoint(url)
+
+        wait = 0.0
+        endpoint_wait = 0.0
+
+        if self.bucket:
+            wait = self.bucket.reserve()
+
+        if endpoint:
+            endpoint_wait = self.endpoints[endpoint].reserve()
+            wait = max(wait, endpoint_wait)
+
+        self._local.last_wait = wait
+
+        with self._lock:
+            self.requests += 1
+            self.wait_time += wait
+
+            if endpoint:
+                self.endpoint_wait_time[endpoint] += endpoint_wait
+
+        return wait
+
+    @property
+    def last_wait(self):
+        """Seconds waited by the last request sent from the current thread"""
+
+        return getattr(self._local, "last_wait", 0.0)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+
+class CircuitBreaker(object):
+    """Circuit breaker for requests towards the API
+
+    The circuit is opened after `failure_threshold` consecutive failures
+    (ServiceTimeout, 5xx responses, connection errors and timeouts). While open, requests fail fast
+    without being sent. After `recovery_timeout` seconds the circuit is
+    half-open, and up to `half_open_max_calls` probe requests are sent. The
+    circuit is closed when all probes succeed, and opened again if any of
+    them fail."""
+
+    def __init__(self, failure_threshold=5, recovery_timeout=30.0, half_open_max_calls=1):
+        """
+        Args:
+            failure_threshold (int):    Consecutive failures before the circuit opens
+            recovery_timeout (float):   Seconds before an open circuit is half-open
+            half_open_max_calls (int):  Number of probe requests in half-open state
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probes = 0
+        self.probe_successes = 0
+
+        self.times_opened = 0
+        self.rejected = 0
+
+        self._lock = threading.Lock()
+
+    def _update_state(self):
+        # Open circuit is half-open after recovery timeout (lock must be held)
+        if (
+            self._state == CIRCUIT_OPEN
+            and time.monotonic() - self.opened_at >= self.recovery_timeout
+        ):
+            self._state = CIRCUIT_HALF_OPEN
+            self.probes = 0
+            self.probe_successes = 0
+
+    @property
+    def state(self):
+        """Current state: closed, open or half-open"""
+
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def allow(self):
+        """Return True if a request can be sent"""
+
+        with self._lock:
+            self._update_state()
+
+            if self._state == CIRCUIT_CLOSED:
+                return True
+
+            if (
+                self._state == CIRCUIT_HALF_OPEN
+                and self.probes < self.half_open_max_calls
+            ):
+                self.probes += 1
+                return True
+
+            self.rejected += 1
+            return False
+
+    def _open(self):
+        self._state = CIRCUIT_OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        warning(
+            "Circuit breaker opened after %d failures, retry in %.1fs",
+            self.failures,
+            self.recovery_timeout,
+        )
+
+    def record_success(self):
+        """Record a request that got a response from the API"""
+
+        with self._lock:
+            self.failures = 0
+
+            if self._state == CIRCUIT_HALF_OPEN:
+                self.probe_successes += 1
+
+                if self.probe_successes >= self.half_open_max_calls:
+                    self._state = CIRCUIT_CLOSED
+                    info("Circuit breaker closed")
+
+    def record_failure(self):
+        """Record a request that failed with ServiceTimeout, a 5xx response, a
+        connection error or a timeout"""
+
+        with self._lock:
+            self.failures += 1
+
+            if self._state == CIRCUIT_HALF_OPEN or (
+                self._state == CIRCUIT_CLOSED
+                and self.failures >= self.failure_threshold
+            ):
+                self._open()
+
+    def release(self):
+        """Record a request that got a response that is neither a success
+        nor a failure, so a new probe can be sent in half-open state"""
+
+        with self._lock:
+            if self._state == CIRCUIT_HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class _Call(object):
+    """Request in flight in SingleFlight"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Coalesce identical requests that are in flight at the same time
+
+    The first caller with a key sends the request, while concurrent callers
+    with the same key wait for it and share its result (or exception).
+    Results are not cached, so a request with the same key sent after the
+    first one completes goes to the API again. The shared result must not be
+    modified by the caller."""
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Return func(), or the result of a call with the same key that is
+        already in flight"""
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+
+            if call.error:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+        return call.result
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_inflight"] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+# Endpoints cached by ResponseCache by default, with the HTTP method that
+# reads from the endpoint (POST is also used for searches)
+DEFAULT_CACHE_ENDPOINTS = {
+    "v1/fact/search": "POST",
+    "v1/object/search": "POST",
+    "v1/object/*/traverse": "POST",
+    "v1/object/*/facts": "POST",
+    "v1/factType": "GET",
+    "v1/objectType": "GET",
+    "v1/origin": "GET",
+}
+
+
+def normalize_params(value):
+    """Return hashable version of request parameters, where keys are
+    camelCase, empty values are removed and lists are sorted. Parameters that
+    only differ in list order or case style give the same result"""
+
+    if isinstance(value, dict):
+        return tuple(
+            sorted(
+                (snake_to_camel(key), normalize_params(item))
+                for key, item in value.items()
+                if item is not None and item != "" and item != [] and item != {}
+            )
+        )
+
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted((normalize_params(item) for item in value), key=repr))
+
+    return value
+
+
+_CacheEntry = namedtuple("_CacheEntry", ["body", "expires", "path"])
+
+
+class ResponseCache(object):
+    """Cache of responses from read-only endpoints (searches, traversals and
+    type lookups)
+
+    Responses are cached for `ttl` seconds, keyed by method, URL, user and
+    normalized parameters (see normalize_params). The least recently used
+    responses are evicted when the cache has more than `max_entries` entries
+    or `max_bytes` bytes. Responses are stored encoded, so each hit returns a
+    new copy that the caller is free to modify.
+
+    Endpoints are matched against the end of the URL path and may contain
+    wildcards, as in RateLimiter."""
+
+    def __init__(
+        self,
+        ttl=300.0,
+        max_entries=1000,
+        max_bytes=64 * 1024 * 1024,
+        endpoints=None,
+        invalidate_on_write=True,
+    ):
+        """
+        Args:
+            ttl (float):                Seconds a response is cached
+            max_entries (int):          Maximum number of cached responses
+            max_bytes (int):            Maximum size of cached responses (bytes,
+                                        encoded JSON)
+            endpoints (dict):           Endpoints to cache -> HTTP method
+                                        (default=DEFAULT_CACHE_ENDPOINTS)
+            invalidate_on_write (bool): Remove affected responses when facts,
+                                        types and origins are added or
+                                        retracted
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.invalidate_on_write = invalidate_on_write
+        self.endpoints = {
+            endpoint.strip("/"): method.upper()
+            for endpoint, method in (endpoints or DEFAULT_CACHE_ENDPOINTS).items()
+        }
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bytes = 0
+
+        self._entries = OrderedDict()  # key -> _CacheEntry, least recent first
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _path(url):
+        return urllib.parse.urlparse(url).path.rstrip("/")
+
+    def cacheable(self, method, url):
+        """Return True if responses from method/url are cached"""
+
+        path = self._path(url)
+
+        return any(
+            method.upper() == endpoint_method
+            and fnmatch.fnmatchcase(path, "*/" + endpoint)
+            for endpoint, endpoint_method in self.endpoints.items()
+        )
+
+    def key(self, method, url, user_id, params=None, json=None):
+        """Return cache key for request"""
+
+        return (
+            method.upper(),
+            url,
+            user_id,
+            normalize_params(params or {}),
+            normalize_params(json or {}),
+        )
+
+    def _remove(self, key):
+        # Lock must be held
+        entry = self._entries.pop(key)
+        self.bytes -= len(entry.body)
+
+    def get(self, key, codec):
+        """Return decoded response for key, or None if it is not cached or
+        expired"""
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry and entry.expires <= time.monotonic():
+                self._remove(key)
+                entry = None
+
+            if not entry:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return codec.loads(entry.body)
+
+    def put(self, key, response, codec):
+        """Cache response for key. Responses larger than max_bytes are not
+        cached"""
+
+        body = codec.encode(response)
+
+        if len(body) > self.max_bytes:
+            debug("Response too large for cache (%d bytes): %s", len(body), key[1])
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = _CacheEntry(
+                body, time.monotonic() + self.ttl, self._path(key[1])
+            )
+            self.bytes += len(body)
+
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def fetch(self, key, func, codec):
+        """Return cached response for key, or the response from func(), which
+        is cached"""
+
+        response = self.get(key, codec)
+
+        if response is None:
+            response = func()
+            self.put(key, response, codec)
+
+        return response
+
+    def invalidate(self, *endpoints):
+        """Remove cached responses from endpoints (patterns matched against
+        the end of the URL path, e.g. "v1/fact/search"). All responses are
+        removed if no endpoints are given. Returns number of responses removed"""
+
+        endpoints = [endpoint.strip("/") for endpoint in endpoints]
+
+        with self._lock:
+            keys = [
+                key
+                for key, entry in self._entries.items()
+                if not endpoints
+                or any(
+                    fnmatch.fnmatchcase(entry.path, "*/" + endpoint)
+                    for endpoint in endpoints
+                )
+            ]
+
+            for key in keys:
+                self._remove(key)
+
+            self.invalidations += len(keys)
+
+        return len(keys)
+
+    def clear(self):
+        """Remove all cached responses"""
+
+        self.invalidate()
+
+    @property
+    def stats(self):
+        """CacheStats with hits, misses, number of entries, bytes, evictions
+        and invalidations"""
+
+        with self._lock:
+            return CacheStats(
+                self.hits,
+                self.misses,
+                len(self._entries),
+                self.bytes,
+                self.evictions,
+                self.invalidations,
+            )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -1,3 +1,5 @@
+import datetime
+import functools
 import logging
 import re
 import sys
@@ -29,6 +31,11 @@ def setup_logging(loglevel="debug", logfile=None, prefix="act"):
         )
 
 
+# Key translations are memoized, since keys are from a small set of field names.
+# The caches are bounded, since keys not in the schema are translated as well
+
+
+@functools.lru_cache(maxsize=4096)
 def snake_to_camel(snake):
     """convert snake_case to camelCase"""
 
@@ -39,12 +46,40 @@ def snake_to_camel(snake):
 # https://stackoverflow.com/questions/1175208/elegant-python-function-to-convert-camelcase-to-snake-case
 
 
+@functools.lru_cache(maxsize=4096)
 def camel_to_snake(camel):
     """convert camelCase to snake_case"""
     camel = re.sub("(.)([A-Z][a-z]+)", r"\1_\2", camel)
     return re.sub("([a-z0-9])([A-Z])", r"\1_\2", camel).lower()
 
 
+def parse_timestamp(timestamp):
+    """Parse timestamp (2016-09-28T21:26:22Z or 2016-09-28T21:26:22.123Z)
+    to datetime"""
+
+    try:
+        return datetime.datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%fZ")
+    except ValueError:
+        return datetime.datetime.strptime(timestamp, act.api.ACT_TIME_FORMAT)
+
+
+def format_timestamp(timestamp):
+    """Format datetime with milliseconds (2016-09-28T21:26:22.123Z)"""
+
+    return "{}.{:03d}Z".format(
+        timestamp.strftime("%Y-%m-%dT%H:%M:%S"), timestamp.microsecond // 1000
+    )
+
+
+def search_timestamp(timestamp, milliseconds=0):
+    """Return timestamp plus milliseconds, with milliseconds
+    (2016-09-28T21:26:22.123Z), so timestamps can be compared as strings"""
+
+    return format_timestamp(
+        parse_timestamp(timestamp) + datetime.timedelta(milliseconds=milliseconds)
+    )
+
+
 def prepare_params(params, exclude_params=None, ensure_list=None):
     """convert all keys to camelCase and filter out values. As default,
     act_baseurl and user_id is filtered out"""
@@ -23,6 +23,14 @@ setup(
     packages=["act.api", "act.api.libs"],
     namespace_packages=["act"],
     install_requires=["caep>=0.1.0", "requests", "responses"],
+    extras_require={
+        "orjson": ["orjson"],
+        "ujson": ["ujson"],
+        "numpy": ["numpy"],
+        "pandas": ["numpy", "pandas"],
+        "arrow": ["numpy", "pyarrow"],
+        "aio": ["httpx"],
+    },
     python_requires=">=2.7, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*, <4",
     classifiers=[
         "Development Status :: 4 - Beta",
@@ -6,3 +6,40 @@ def get_mock_data(filename):
     dirname = os.path.dirname(os.path.realpath(__file__))
     with open(os.path.join(dirname, filename), "r") as f:
         return json.loads(f.read())
+
+
+def search_callback(entries, timestamps):
+    """Callback for responses, returning the most recent entries (by the most
+    recent of timestamps(entry)) with any timestamp before the "before"
+    timestamp in the request"""
+
+    def callback(request):
+        params = json.loads(request.body)
+        before = params.get("before")
+
+        matches = sorted(
+            [
+                e
+                for e in entries
+                if not before or any(ts < before for ts in timestamps(e))
+            ],
+            key=lambda e: max(timestamps(e)),
+            reverse=True,
+        )
+        page = matches[: params["limit"]]
+
+        return (
+            200,
+            {},
+            json.dumps(
+                {
+                    "responseCode": 200,
+                    "limit": params["limit"],
+                    "count": len(matches),
+                    "size": len(page),
+                    "data": page,
+                }
+            ),
+        )
+
+    return callback
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Compare generic and generated (de)serialization of Fact, Object and MetaFact
+
+Run from the repository root:
+
+    PYTHONPATH=. python3 test/benchmark_schema.py
+"""
+
+import contextlib
+import logging
+import timeit
+
+from act_test import get_mock_data
+
+from act.api.fact import Fact, MetaFact
+from act.api.obj import Object
+from act.api.schema import Schema
+
+NUMBER = 2000
+
+
+def subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from subclasses(subclass)
+
+
+@contextlib.contextmanager
+def generic():
+    """Use the generic serialize/deserialize on all schemas"""
+
+    compiled = {}
+
+    for cls in subclasses(Schema):
+        if "_deserialize_compiled" in cls.__dict__:
+            compiled[cls] = (cls._serialize_compiled, cls._deserialize_compiled)
+            cls._serialize_compiled = cls._deserialize_compiled = None
+
+    try:
+        yield
+    finally:
+        for cls, (serializer, deserializer) in compiled.items():
+            cls._serialize_compiled = serializer
+            cls._deserialize_compiled = deserializer
+
+
+def timed(func):
+    return min(timeit.repeat(func, number=NUMBER, repeat=5))
+
+
+def bench(name, cls, entries):
+    obj = cls(**entries)
+
+    with generic():
+        generic_obj = cls(**entries)
+        assert generic_obj.serialize() == obj.serialize()
+        assert repr(generic_obj) == repr(obj)
+
+    for op, func in (
+        ("deserialize", lambda: cls(**entries)),
+        ("serialize", obj.serialize),
+    ):
+        with generic():
+            t_generic = timed(func)
+        t_compiled = timed(func)
+
+        print(
+            "{:<10} {:<12} generic {:7.1f}us  generated {:7.1f}us  {:.2f}x".format(
+                name,
+                op,
+                t_generic / NUMBER * 1e6,
+                t_compiled / NUMBER * 1e6,
+                t_generic / t_compiled,
+            )
+        )
+
+
+def main():
+    # Mock data contains keys unknown to the schema
+    logging.disable(logging.WARNING)
+
+    fact = get_mock_data("data/post_v1_fact_search_200.json")["json"]["data"][0]
+    obj = get_mock_data("data/post_v1_object_search_200.json")["json"]["data"][0]
+    meta = get_mock_data("data/post_v1_fact_uuid_meta_201.json")["json"]["data"]
+
+    bench("Fact", Fact, fact)
+    bench("Object", Object, obj)
+    bench("MetaFact", MetaFact, meta)
+
+
+if __name__ == "__main__":
+    main()
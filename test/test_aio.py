@@ -0,0 +1,214 @@
+import asyncio
+import base64
+import json
+
+import pytest
+import requests.auth
+from act_test import get_mock_data
+
+import act.api
+from act.api.transport import CircuitBreaker, RetryPolicy
+
+httpx = pytest.importorskip("httpx")
+
+from act.api.aio import AsyncAct  # noqa: E402
+
+
+def mock_transport(mocks, calls, delay=0.0, active=None):
+    """httpx transport returning mock data by method and path"""
+
+    async def handler(request):
+        calls.append(request)
+
+        if active is not None:
+            active[0] += 1
+            active[1] = max(active)
+
+        await asyncio.sleep(delay)
+
+        if active is not None:
+            active[0] -= 1
+
+        mock = mocks[(request.method, request.url.path)]
+
+        return httpx.Response(mock["status_code"], json=mock["json"])
+
+    return httpx.MockTransport(handler)
+
+
+def test_async_fact_search():
+    mock = get_mock_data("data/post_v1_fact_search_200.json")
+    calls = []
+    active = [0, 0]  # active, max active
+
+    transport = mock_transport(
+        {("POST", "/v1/fact/search"): mock}, calls, delay=0.01, active=active
+    )
+
+    async def search():
+        async with AsyncAct(
+            "http://localhost:8080", 1, concurrency=4, transport=transport
+        ) as c:
+            return await asyncio.gather(
+                *[c.fact_search(fact_type="seenIn", limit=1) for _ in range(10)]
+            )
+
+    results = asyncio.run(search())
+
+    assert len(calls) == 10
+    assert all(isinstance(result[0], act.api.fact.Fact) for result in results)
+    assert all(result[0].type.name == "seenIn" for result in results)
+
+    # Concurrent requests are bounded by concurrency
+    assert 1 < active[1] <= 4
+
+    # Same request as Act.fact_search
+    assert json.loads(calls[0].content) == {"factType": ["seenIn"], "limit": 1}
+    assert calls[0].headers["ACT-User-ID"] == "1"
+
+    async def stream():
+        async with AsyncAct("http://localhost:8080", 1, transport=transport) as c:
+            await c.fact_search(fact_type="seenIn", stream=True)
+
+    with pytest.raises(act.api.base.ArgumentError):
+        asyncio.run(stream())
+
+
+def test_async_add_fact():
+    mock = get_mock_data("data/post_v1_fact_127.0.0.1_201.json")
+    calls = []
+    transport = mock_transport({("POST", "/v1/fact"): mock}, calls)
+
+    async def add():
+        async with AsyncAct("http://localhost:8080", 1, transport=transport) as c:
+            fact = (
+                c.fact("seenIn", "report")
+                .source("ipv4", "127.0.0.1")
+                .destination("report", "xyz")
+            )
+            return await c.add(fact)
+
+    fact = asyncio.run(add())
+
+    assert fact.id
+    assert fact.source_object.value == "127.0.0.1"
+    assert json.loads(calls[0].content)["sourceObject"] == "ipv4/127.0.0.1"
+
+
+def test_async_create_fact_type():
+    fact_type = get_mock_data("data/post_v1_factType_threatActorAlias_201.json")
+    calls = []
+    transport = mock_transport(
+        {
+            ("GET", "/v1/factType"): get_mock_data("data/get_v1_factType_200.json"),
+            ("GET", "/v1/objectType"): get_mock_data(
+                "data/get_v1_objectType_200.json"
+            ),
+            ("POST", "/v1/factType"): fact_type,
+            (
+                "PUT",
+                "/v1/factType/uuid/{}".format(fact_type["json"]["data"]["id"]),
+            ): fact_type,
+        },
+        calls,
+    )
+
+    async def create(name):
+        async with AsyncAct("http://localhost:8080", 1, transport=transport) as c:
+            return await c.create_fact_type_all_bindings(name)
+
+    # Fact types and object types are fetched before the fact type is created
+    assert asyncio.run(create("newFactType")).name == "threatActorAlias"
+    assert [(call.method, call.url.path) for call in calls] == [
+        ("GET", "/v1/factType"),
+        ("GET", "/v1/objectType"),
+        ("POST", "/v1/factType"),
+    ]
+
+    # or bindings are added to the existing fact type
+    calls.clear()
+    asyncio.run(create("threatActorAlias"))
+    assert [call.method for call in calls] == ["GET", "GET", "PUT"]
+    assert "addObjectBindings" in json.loads(calls[-1].content)
+
+
+def test_async_retry():
+    mock = get_mock_data("data/get_v1_factType_200.json")
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+
+        if len(calls) == 1:
+            raise httpx.ConnectError("connection refused", request=request)
+
+        if len(calls) == 2:
+            raise httpx.ReadTimeout("timeout", request=request)
+
+        return httpx.Response(200, json=mock["json"])
+
+    breaker = CircuitBreaker(failure_threshold=5)
+
+    async def get_fact_types():
+        async with AsyncAct(
+            "http://localhost:8080",
+            1,
+            transport=httpx.MockTransport(handler),
+            retry_policy=RetryPolicy(max_retries=3, backoff_factor=0),
+            circuit_breaker=breaker,
+        ) as c:
+            # Connection errors are retried, timeouts are not
+            with pytest.raises(httpx.ReadTimeout):
+                await c.get_fact_types()
+
+            return await c.get_fact_types()
+
+    fact_types = asyncio.run(get_fact_types())
+
+    assert len(calls) == 3
+    assert fact_types[0].name
+    assert breaker.failures == 0
+
+
+def test_async_requests_kwargs():
+    mock = get_mock_data("data/get_v1_factType_200.json")
+    calls = []
+    transport = mock_transport({("GET", "/v1/factType"): mock}, calls)
+
+    async def get_fact_types(auth):
+        async with AsyncAct(
+            "http://localhost:8080",
+            1,
+            transport=transport,
+            requests_common_kwargs={"auth": auth, "headers": {"X-Test": "1"}},
+        ) as c:
+            return await c.get_fact_types()
+
+    # auth is sent as with requests (basic auth)
+    basic = "Basic " + base64.b64encode(b"act:secret").decode("ascii")
+
+    for auth in (("act", "secret"), requests.auth.HTTPBasicAuth("act", "secret")):
+        calls.clear()
+        assert asyncio.run(get_fact_types(auth))[0].name
+        assert calls[0].headers["Authorization"] == basic
+        assert calls[0].headers["X-Test"] == "1"
+
+    # requests arguments that are not supported are not ignored
+    with pytest.raises(act.api.base.ArgumentError):
+        AsyncAct("http://localhost:8080", 1, requests_common_kwargs={"stream": True})
+
+    with pytest.raises(act.api.base.ArgumentError):
+        AsyncAct(
+            "http://localhost:8080",
+            1,
+            requests_common_kwargs={"auth": requests.auth.HTTPProxyAuth("a", "b")},
+        )
+
+    # Proxies are mounted by URL scheme
+    c = AsyncAct(
+        "http://localhost:8080",
+        1,
+        requests_common_kwargs={"proxies": {"https": "http://proxy:3128"}},
+    )
+    assert [pattern.pattern for pattern in c.client._mounts] == ["https://"]
+    asyncio.run(c.close())
@@ -1,5 +1,13 @@
+import copy
+import gzip
+import json
+import pickle
+
 import pytest
+import responses
+from act_test import get_mock_data
 
+import act.api
 from act.api.base import ActBase, Comment, NameSpace, Organization, Origin
 
 
@@ -33,3 +41,89 @@ def test_equailty():
     assert origin_mnemonic != origin_google
 
     assert Comment("a") == Comment("a")
+
+
+@responses.activate
+def test_pooled_session():
+    mock = get_mock_data("data/get_v1_factType_200.json")
+    responses.add(
+        responses.GET, mock["url"], json=mock["json"], status=mock["status_code"]
+    )
+
+    with act.api.Act("http://localhost:8080", 1, pool_maxsize=4) as c:
+        session = c.config.session
+
+        # All requests should be sent through the same pooled session
+        c.get_fact_types()
+        c.get_fact_types()
+        assert c.config.session is session
+        assert len(responses.calls) == 2
+
+        adapter = session.get_adapter("http://localhost:8080")
+        assert adapter._pool_maxsize == 4
+
+    # Session should be released when the Act instance is closed
+    assert c.config._session is None
+
+
+def test_config_copy():
+    config = act.api.Act("", 1).config
+
+    # Config (and the session) should be shared by copies of facts
+    assert copy.deepcopy(config) is config
+
+    restored = pickle.loads(pickle.dumps(config))
+    assert restored.user_id == 1
+    assert restored.session is not config.session
+
+
+@responses.activate
+def test_compressed_request():
+    mock = get_mock_data("data/post_v1_fact_search_200.json")
+    responses.add(
+        responses.POST, mock["url"], json=mock["json"], status=mock["status_code"]
+    )
+
+    c = act.api.Act("http://localhost:8080", 1, compress_threshold=1024)
+
+    # Small requests are not compressed
+    c.fact_search(object_value="127.0.0.1")
+    assert "Content-Encoding" not in responses.calls[0].request.headers
+
+    values = ["127.0.0.{}".format(i) for i in range(256)]
+    facts = c.fact_search(object_value=values)
+
+    assert len(facts) == 1
+
+    request = responses.calls[1].request
+    assert request.headers["Content-Encoding"] == "gzip"
+    assert request.headers["Content-Type"] == "application/json"
+    assert "gzip" in request.headers["Accept-Encoding"]
+    assert json.loads(gzip.decompress(request.body))["objectValue"] == values
+
+
+def test_slots():
+    c = act.api.Act("", 1)
+    fact = c.fact("seenIn", "report").source("ipv4", "127.0.0.1")
+
+    # Facts and nested objects should not have a __dict__
+    for obj in (fact, fact.source_object, fact.source_object.type, fact.origin):
+        assert not hasattr(obj, "__dict__")
+
+    assert Origin().config is None
+
+    # Fields are still available as attributes
+    fact.value = "incident"
+    assert fact.data["value"] == "incident"
+
+    with pytest.raises(AttributeError):
+        fact.unknown_attribute = "value"
+
+    # Subclasses without __slots__ can still set other attributes
+    child = Child()
+    child.custom = "value"
+    assert child.custom == "value"
+
+    restored = pickle.loads(pickle.dumps(fact))
+    assert restored == fact
+    assert restored.config.user_id == 1
@@ -0,0 +1,75 @@
+import pickle
+
+import pytest
+import responses
+from act_test import get_mock_data
+
+import act.api
+from act.api.codec import DEFAULT_CODEC, JSONCodec, OrjsonCodec, get_codec
+
+
+def test_get_codec():
+    assert get_codec() is DEFAULT_CODEC
+    assert get_codec("json").name == "json"
+
+    codec = JSONCodec()
+    assert get_codec(codec) is codec
+
+    with pytest.raises(ValueError):
+        get_codec("unknown")
+
+
+def test_codecs_preserve_key_order():
+    pytest.importorskip("orjson")
+
+    data = {"type": "mentions", "value": "report/æøå", "accessMode": "Public"}
+
+    for codec in (get_codec("json"), get_codec("orjson"), get_codec("auto")):
+        assert codec.loads(codec.dumps(data)) == data
+        assert list(codec.loads(codec.encode(data)).keys()) == list(data.keys())
+        assert pickle.loads(pickle.dumps(codec)).loads(codec.encode(data)) == data
+
+    assert isinstance(get_codec("auto"), OrjsonCodec)
+
+    with pytest.raises(ValueError):
+        get_codec("orjson").loads(b"{")
+
+
+def test_codecs_output():
+    pytest.importorskip("orjson")
+
+    data = {"value": "æøå"}
+
+    # Output differs beyond whitespace: orjson does not escape non-ASCII
+    assert get_codec("json").dumps(data) == '{"value": "\\u00e6\\u00f8\\u00e5"}'
+    assert get_codec("orjson").dumps(data) == '{"value":"æøå"}'
+
+
+def test_fact_json():
+    fact = (
+        act.api.Act("", None, "error")
+        .fact("mentions", "ipv4")
+        .source("report", "xyz")
+        .destination("ipv4", "127.0.0.1")
+    )
+
+    # Default codec gives the same output as the standard library
+    assert fact.json() == act.api.schema.Schema.json(fact)
+    assert fact.json().startswith('{"type": "mentions", "value": "ipv4"')
+
+
+@responses.activate
+def test_fact_search_codec():
+    pytest.importorskip("orjson")
+
+    mock = get_mock_data("data/post_v1_fact_search_200.json")
+    responses.add(
+        responses.POST, mock["url"], json=mock["json"], status=mock["status_code"]
+    )
+
+    c = act.api.Act("http://localhost:8080", 1, json_codec="orjson")
+    facts = c.fact_search(fact_type="seenIn", limit=1)
+
+    assert facts[0].type.name == "seenIn"
+    assert responses.calls[0].request.body == b'{"factType":["seenIn"],"limit":1}'
+    assert facts[0].json() == get_codec("orjson").dumps(facts[0].serialize())
@@ -0,0 +1,107 @@
+import pytest
+from act_test import get_mock_data
+
+import act.api
+from act.api.columnar import Column, to_columns
+
+
+def fact_result_set():
+    mock = get_mock_data("data/post_v1_fact_search_200.json")["json"]
+    meta = get_mock_data("data/post_v1_fact_uuid_meta_201.json")["json"]["data"]
+
+    return act.api.base.ActResultSet(
+        dict(mock, data=mock["data"] + [meta]),
+        act.api.fact.auto_fact_type,
+        keep_entries=True,
+    )
+
+
+def test_columns():
+    facts = fact_result_set()
+
+    columns = to_columns(facts.entries)
+
+    # Same values as the facts
+    assert columns["id"] == [fact.id for fact in facts]
+    assert columns["type"] == [fact.type.name for fact in facts]
+    assert columns["source_value"] == [
+        fact.source_object.value if fact.source_object else None for fact in facts
+    ]
+    assert columns["in_reference_to"] == [None, facts[1].in_reference_to.id]
+
+    # Custom columns
+    columns = to_columns(facts.entries, [Column("name", ("organization", "name"))])
+    assert columns == {"name": [fact.organization.name for fact in facts]}
+
+    # No default columns for other types
+    comments = act.api.base.ActResultSet(
+        {"data": [], "size": 0, "count": 0, "limit": 0, "responseCode": 200},
+        act.api.base.Comment,
+        keep_entries=True,
+    )
+    with pytest.raises(act.api.base.ArgumentError):
+        comments.to_records()
+
+    # Entries are not kept by default
+    facts = act.api.base.ActResultSet(
+        get_mock_data("data/post_v1_fact_search_200.json")["json"],
+        act.api.fact.auto_fact_type,
+    )
+    assert facts.entries is None
+    with pytest.raises(act.api.base.ArgumentError):
+        facts.to_records()
+
+    # but by lazy result sets
+    facts = act.api.base.ActResultSet(
+        get_mock_data("data/post_v1_fact_search_200.json")["json"],
+        act.api.fact.auto_fact_type,
+        lazy=True,
+    )
+    assert to_columns(facts.entries)["id"] == [fact.id for fact in facts]
+
+
+def test_to_records(monkeypatch):
+    numpy = pytest.importorskip("numpy")
+
+    deserialize = act.api.base.ActResultSet._deserialize
+    deserialized = []
+
+    def counted_deserialize(self, entries):
+        deserialized.extend(entries)
+        return deserialize(self, entries)
+
+    monkeypatch.setattr(act.api.base.ActResultSet, "_deserialize", counted_deserialize)
+
+    # Columns are exported without creating facts
+    facts = fact_result_set()
+    records = facts.to_records()
+    assert deserialized == []
+
+    assert list(records.id) == [fact.id for fact in facts]
+    assert records.timestamp.dtype == numpy.dtype("datetime64[ms]")
+    assert records.timestamp[0] == numpy.datetime64(facts[0].timestamp.rstrip("Z"))
+    assert numpy.isnan(records.confidence[0])
+
+
+def test_to_pandas():
+    pytest.importorskip("pandas")
+
+    mock = get_mock_data("data/post_v1_object_search_200.json")["json"]
+    objects = act.api.base.ActResultSet(mock, act.api.obj.Object, keep_entries=True)
+
+    df = objects.to_pandas()
+
+    assert list(df.columns) == ["id", "type", "value"]
+    assert list(df["value"]) == [obj.value for obj in objects]
+
+
+def test_to_arrow():
+    pytest.importorskip("pyarrow")
+
+    facts = fact_result_set()
+    table = facts.to_arrow()
+
+    assert table.column_names == [c.name for c in act.api.columnar.FACT_COLUMNS]
+    assert table.to_pydict()["type"] == [fact.type.name for fact in facts]
+    assert table.to_pydict()["confidence"] == [None, None]
+    assert str(table.schema.field("timestamp").type) == "timestamp[ms]"
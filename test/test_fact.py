@@ -1,8 +1,11 @@
+import copy
+import json
+import pickle
 import re
 
 import pytest
 import responses
-from act_test import get_mock_data
+from act_test import get_mock_data, search_callback
 
 import act
 
@@ -484,3 +487,405 @@ def test_fact_equality():
     assert act.api.fact.FactType("observedIn") == act.api.fact.FactType(
         "observedIn", id="dummy"
     )
+
+
+@responses.activate
+def test_fact_search_lazy_fields():
+    mock = get_mock_data("data/post_v1_fact_search_200.json")
+    responses.add(
+        responses.POST, mock["url"], json=mock["json"], status=mock["status_code"]
+    )
+
+    c = act.api.Act("http://localhost:8080", 1)
+
+    facts = c.fact_search(fact_type=["seenIn"], limit=1)
+    lazy_facts = c.fact_search(fact_type=["seenIn"], limit=1, lazy_fields=True)
+
+    # lazy_fields should not be sent to the API
+    assert b"lazy" not in responses.calls[1].request.body
+
+    fact = lazy_facts[0]
+
+    # Nested fields are kept as raw dicts until accessed
+    assert isinstance(fact._data["type"], dict)
+    assert isinstance(fact._data["source_object"], dict)
+
+    assert fact.type.name == "seenIn"
+    assert isinstance(fact._data["type"], act.api.fact.FactType)
+    assert isinstance(fact._data["source_object"], dict)
+
+    # Nested objects are lazy as well
+    assert isinstance(fact.source_object._data["type"], dict)
+    assert fact.source_object.type == facts[0].source_object.type
+
+    # data, serialize and equality deserializes all fields
+    assert fact == facts[0]
+    assert fact.serialize() == facts[0].serialize()
+    assert not fact._pending
+
+
+@responses.activate
+def test_fact_search_interning():
+    mock = get_mock_data("data/post_v1_fact_search_200.json")
+    responses.add(
+        responses.POST, mock["url"], json=mock["json"], status=mock["status_code"]
+    )
+
+    c = act.api.Act("http://localhost:8080", 1, intern_size=100)
+
+    fact = c.fact_search(fact_type=["seenIn"], limit=1)[0]
+    fact2 = c.fact_search(fact_type=["seenIn"], limit=1)[0]
+
+    # Reference types are shared between results
+    assert fact is not fact2
+    assert fact.type is fact2.type
+    assert fact.source_object.type is fact2.source_object.type
+    assert c.config.interner.hits > 0
+
+    # Interner is bounded
+    interner = act.api.schema.Interner(maxsize=2)
+    for name in ("a", "b", "c"):
+        interner.intern(act.api.fact.FactType, {"id": name, "name": name})
+    assert len(interner) == 2
+
+    # Interned objects are immutable
+    assert fact.type.frozen
+    with pytest.raises(TypeError):
+        fact.type.name = "mentions"
+    with pytest.raises(TypeError):
+        fact.type.data = {}
+
+    # Facts with interned objects can be copied and pickled
+    copied = copy.deepcopy(fact)
+    assert copied == fact
+    assert copied.type == fact.type
+    assert pickle.loads(pickle.dumps(fact)) == fact
+
+    # Facts are not interned without intern_size
+    c = act.api.Act("http://localhost:8080", 1)
+    fact = c.fact_search(fact_type=["seenIn"], limit=1)[0]
+    fact2 = c.fact_search(fact_type=["seenIn"], limit=1)[0]
+    assert fact.type is not fact2.type
+    assert not fact.type.frozen
+
+
+def test_fact_hash_cache():
+    c = act.api.Act("http://localhost:8080", 1)
+
+    f1 = (
+        c.fact("observedIn")
+        .source("uri", "http://uri.no")
+        .destination("incident", "x")
+    )
+    f2 = (
+        c.fact("observedIn")
+        .source("uri", "http://uri.no")
+        .destination("incident", "x")
+    )
+
+    assert f1 == f2
+    assert f1.data._hash == hash(f1) == hash(f2)
+
+    # Hash is invalidated when fields are changed
+    f1.value = "changed"
+    assert f1 != f2
+    f1.value = f2.value
+    assert f1 == f2
+
+    # ..when data is changed
+    f1.data["value"] = "changed"
+    assert f1 != f2
+    f1.data.update(value=f2.value)
+    assert f1 == f2
+
+    # ..and when nested objects are changed
+    f1.source_object.value = "http://other.no"
+    assert f1 != f2
+    f1.source_object.data = {}
+    f1.source_object.deserialize(**f2.source_object.serialize())
+    assert f1 == f2
+    assert hash(f1) == hash(f2)
+
+    # ..and when nested objects are replaced
+    hash(f1)
+    f1.source_object.type.data = dict(f1.source_object.type.data, name="fqdn")
+    assert hash(f1) != hash(f2)
+
+    # Cached hash is not pickled (hashes differ between processes)
+    assert not hasattr(pickle.loads(pickle.dumps(f1)).data, "_hash")
+    assert pickle.loads(pickle.dumps(f1)) == f1
+
+
+def test_fact_hash_cache_per_object(monkeypatch):
+    c = act.api.Act("http://localhost:8080", 1)
+
+    calls = []
+    fact_hash = Fact.__hash__.__wrapped__
+
+    def counted_hash(self):
+        calls.append(self)
+        return fact_hash(self)
+
+    monkeypatch.setattr(Fact, "__hash__", act.api.schema.cached_hash(counted_hash))
+
+    def new_fact(value):
+        return c.fact("seenIn").source("ipv4", value).destination("report", "x")
+
+    facts = {new_fact("127.0.0.{}".format(i)) for i in range(10)}
+    assert len(calls) == 10
+
+    # Creating and changing other facts does not invalidate cached hashes
+    for i in range(100):
+        fact = new_fact("127.0.0.{}".format(i % 10))
+        fact.value = "value"
+        assert fact not in facts
+
+    assert len(calls) == 10 + 100
+
+
+@responses.activate
+def test_fact_hash_cache_parents():
+    mock = get_mock_data("data/post_v1_fact_search_200.json")
+    template = mock["json"]["data"][0]
+    responses.add(
+        responses.POST,
+        mock["url"],
+        json=dict(
+            mock["json"],
+            data=[dict(template, id=str(i), value=str(i)) for i in range(1000)],
+            size=1000,
+        ),
+    )
+
+    c = act.api.Act("http://localhost:8080", 1, intern_size=100)
+    facts = c.fact_search(fact_type=["seenIn"], limit=1000)
+
+    # Parents are not registered in shared, frozen (interned) types
+    assert len(set(facts)) == 1000
+    assert facts[0].type is facts[-1].type
+    assert not hasattr(facts[0].type.data, "_parents")
+
+    # Objects shared by facts that are not frozen invalidate all facts
+    obj = Object("ipv4", "127.0.0.1")
+    shared = [
+        c.fact("seenIn", str(i)).source("ipv4", "x").destination("report", "x")
+        for i in range(10)
+    ]
+    for fact in shared:
+        fact.source_object = obj
+
+    hashes = [hash(fact) for fact in shared]
+    obj.value = "127.0.0.2"
+    assert all(fact.data._hash is None for fact in shared)
+    assert all(hash(f) != h for f, h in zip(shared, hashes))
+
+    # ..and facts that are garbage collected are removed
+    del shared, fact
+    assert len(obj.data._parents) == 0
+
+
+@responses.activate
+def test_fact_clone():
+    mock = get_mock_data("data/post_v1_fact_search_200.json")
+    responses.add(
+        responses.POST, mock["url"], json=mock["json"], status=mock["status_code"]
+    )
+
+    c = act.api.Act("http://localhost:8080", 1)
+    fact = c.fact_search(fact_type=["seenIn"], limit=1)[0]
+    clone = fact.clone()
+
+    assert clone == fact
+    assert clone.serialize() == fact.serialize()
+    assert repr(clone) == repr(fact)
+    assert clone.config is fact.config
+
+    # Nested objects are copied
+    assert clone.type is not fact.type
+    assert clone.source_object.type is not fact.source_object.type
+    assert clone.source_object is not fact.source_object
+    assert clone.source_object.config is fact.source_object.config
+
+    clone.source_object.value = "changed"
+    assert fact.source_object.value != "changed"
+    assert clone != fact
+
+    # The referenced fact is cloned as well
+    meta = fact.meta("observationTime", "1624450340")
+    meta_clone = meta.clone()
+    assert meta_clone == meta
+    assert meta_clone.in_reference_to is not meta.in_reference_to
+
+    # Frozen (interned) objects are shared
+    c = act.api.Act("http://localhost:8080", 1, intern_size=100)
+    fact = c.fact_search(fact_type=["seenIn"], limit=1)[0]
+    clone = fact.clone()
+
+    assert fact.type.frozen
+    assert clone.type is fact.type
+    assert clone.source_object.type is fact.source_object.type
+
+
+def test_format_and_validate_clone():
+    c = act.api.Act("", 1, object_formatter=lambda object_type, value: value.lower())
+
+    fact = c.fact("mentions").source("report", "XYZ").destination("fqdn", "A.NO")
+
+    facts = act.api.helpers.format_and_validate([fact])
+
+    assert facts[0].destination_object.value == "a.no"
+    assert fact.destination_object.value == "A.NO"  # not modified
+
+    # Types are copied as well, unless they are frozen
+    facts = act.api.helpers.format_and_validate([fact])
+    facts[0].type.name = "x"
+    facts[0].source_object.type.name = "x"
+    assert fact.type.name == "mentions"
+    assert fact.source_object.type.name == "report"
+
+    # fact_chain does not modify the placeholders in the facts
+    facts = (
+        c.fact("observedIn")
+        .source("uri", "http://uri.no")
+        .destination("incident", "*"),
+        c.fact("attributedTo")
+        .source("incident", "*")
+        .destination("threatActor", "APT99"),
+    )
+    chain = act.api.fact.fact_chain(*facts)
+    assert chain[0].destination_object.value.startswith("[placeholder[")
+    assert facts[0].destination_object.value == "*"
+
+
+def test_fact_search_batch():
+    mock = get_mock_data("data/post_v1_fact_search_200.json")
+    meta = get_mock_data("data/post_v1_fact_uuid_meta_201.json")["json"]["data"]
+
+    c = act.api.Act("http://localhost:8080", 1)
+
+    entries = [meta] + mock["json"]["data"] + [meta]
+    result = act.api.base.ActResultSet(
+        dict(mock["json"], data=entries), act.api.fact.auto_fact_type, c.config
+    )
+
+    # Same result as deserializing each entry, in the same order
+    assert [type(fact) for fact in result] == [
+        type(act.api.fact.auto_fact_type(**entry)) for entry in entries
+    ]
+    assert list(result) == [act.api.fact.auto_fact_type(**entry) for entry in entries]
+    assert all(fact.config is c.config for fact in result)
+
+    # Objects created without config
+    facts = Fact.deserialize_batch(mock["json"]["data"], config=None)
+    assert facts[0].config is None
+    assert facts[0] == Fact(**mock["json"]["data"][0])
+
+    with pytest.raises(act.api.fact.UnknownType):
+        act.api.fact.auto_fact_type_batch([{"value": "x"}])
+
+
+@responses.activate
+def test_iter_fact_search():
+    mock = get_mock_data("data/post_v1_fact_search_200.json")
+
+    timestamps = [
+        "2018-12-12T07:48:21.761Z",
+        "2018-12-12T07:48:21.761Z",
+        "2018-12-12T07:48:21.760Z",
+        "2018-12-12T07:48:21.000Z",
+        "2018-12-12T07:48:20.999Z",
+        "2018-12-12T07:48:20.999Z",
+        "2018-12-11T23:59:59.999Z",
+    ]
+
+    entries = [
+        dict(mock["json"]["data"][0], id=str(i), timestamp=timestamp)
+        for i, timestamp in enumerate(timestamps)
+    ]
+
+    responses.add_callback(
+        responses.POST,
+        mock["url"],
+        callback=search_callback(entries, lambda e: [e["timestamp"]]),
+    )
+
+    c = act.api.Act("http://localhost:8080", 1)
+
+    facts = list(c.iter_fact_search(fact_type=["seenIn"], page_size=3))
+
+    # All facts, in order, without duplicates
+    assert [fact.id for fact in facts] == [str(i) for i in range(len(timestamps))]
+    assert all(fact.config is c.config for fact in facts)
+
+    # Next page is requested before the millisecond after the oldest fact
+    requests = [json.loads(call.request.body) for call in responses.calls]
+    assert "before" not in requests[0]
+    assert requests[1]["before"] == "2018-12-12T07:48:21.761Z"
+    assert requests[2]["before"] == "2018-12-12T07:48:21.000Z"
+    assert all(request["limit"] == 3 for request in requests)
+
+    search_timestamp = act.api.utils.search_timestamp
+    assert search_timestamp("2018-12-31T23:59:59Z") == "2018-12-31T23:59:59.000Z"
+    assert search_timestamp("2018-12-31T23:59:59.999Z", milliseconds=1) == (
+        "2019-01-01T00:00:00.000Z"
+    )
+
+    with pytest.raises(act.api.base.ArgumentError):
+        list(c.iter_fact_search(limit=10))
+
+
+def test_fact_search_lazy():
+    mock = get_mock_data("data/post_v1_fact_search_200.json")
+    meta = get_mock_data("data/post_v1_fact_uuid_meta_201.json")["json"]["data"]
+
+    c = act.api.Act("http://localhost:8080", 1)
+
+    entries = [meta] + mock["json"]["data"] * 3 + [meta]
+    expected = [act.api.fact.auto_fact_type(**entry) for entry in entries]
+
+    result = act.api.base.ActResultSet(
+        dict(mock["json"], data=entries),
+        act.api.fact.auto_fact_type,
+        c.config,
+        lazy=True,
+    )
+
+    def deserialized():
+        pending = act.api.base._PENDING
+        return [i for i, item in enumerate(result._data) if item is not pending]
+
+    # Nothing is deserialized by len, bool and metadata
+    assert len(result) == 5
+    assert result
+    assert result.size == mock["json"]["size"]
+    assert deserialized() == []
+
+    # Only entries accessed are deserialized, and they are cached
+    assert result[1] == expected[1]
+    assert result[1] is result[1]
+    assert result[-1] == expected[-1]
+    assert isinstance(result[-1], act.api.fact.MetaFact)
+    assert result[2:4] == expected[2:4]
+    assert deserialized() == [1, 2, 3, 4]
+    assert result[0].config is c.config
+
+    # Calls are applied to entries deserialized later
+    result = act.api.base.ActResultSet(
+        dict(mock["json"], data=entries),
+        act.api.fact.auto_fact_type,
+        c.config,
+        lazy=True,
+    )
+    first = result[0]
+    assert result("configure", None) is result
+    assert deserialized() == [0]
+    assert result[0] is first and first.config is None
+    assert result[1].config is None
+
+    # Iteration gives the same result as an eager result set
+    assert list(result) == expected
+    assert result.data == expected
+    assert deserialized() == list(range(5))
+
+    with pytest.raises(IndexError):
+        result[5]
@@ -1,8 +1,13 @@
 """ Test for act helpers """
 
+import re
+
 import pytest
+import responses
+from act_test import get_mock_data
 
 import act.api
+from act.api.re import UUID_MATCH
 
 
 def test_add_uri_fqdn() -> None:  # type: ignore
@@ -137,3 +142,41 @@ def test_ip_obj() -> None:
     ) == api.fact("resolvesTo").source("fqdn", "localhost").destination(
         *act.api.helpers.ip_obj("127.0.0.1")
     )
+
+
+@responses.activate
+def test_add_facts() -> None:
+    """Test concurrent submission of facts"""
+
+    for filename in (
+        "data/post_v1_fact_127.0.0.1_201.json",
+        "data/post_v1_fact_127.0.0.x_412.json",
+    ):
+        mock = get_mock_data(filename)
+        responses.add(
+            responses.POST, mock["url"], json=mock["json"], status=mock["status_code"]
+        )
+
+    api = act.api.Act("http://localhost:8080", 1, "error")
+    invalid_api = act.api.Act("http://localhost:8888", 1, "error")
+
+    facts = [
+        api.fact("seenIn", "report").source("ipv4", "127.0.0.1").destination(
+            "report", "xyz"
+        ),
+        invalid_api.fact("mentions", "report").source("report", "xyz").destination(
+            "ipv4", "127.0.0.x"
+        ),
+        api.fact("seenIn", "report").source("ipv4", "127.0.0.1").destination(
+            "report", "xyz"
+        ),
+    ]
+
+    results = api.add_facts(facts, workers=3)
+
+    assert len(results) == 3
+    assert re.search(UUID_MATCH, results[0].id)
+    assert results[0].fact is facts[0]
+    assert isinstance(results[1].error, act.api.base.ValidationError)
+    assert results[1].id is None
+    assert re.search(UUID_MATCH, results[2].id)
@@ -1,8 +1,9 @@
+import json
 import re
 
 import pytest
 import responses
-from act_test import get_mock_data
+from act_test import get_mock_data, search_callback
 
 import act
 from act.api.re import UUID, UUID_MATCH
@@ -152,3 +153,56 @@ def test_equality():
     # Should be equal even though one of the items has an id
     assert act.api.obj.Object("fqdn") == act.api.obj.Object("fqdn", id="dummy")
     assert act.api.obj.Object("fqdn") != act.api.obj.Object("ipv4")
+
+
+@responses.activate
+def test_iter_object_search():
+    mock = get_mock_data("data/post_v1_object_search_200.json")
+    template = mock["json"]["data"][0]
+
+    def entry(i, *timestamps):
+        return dict(
+            template,
+            id=str(i),
+            statistics=[
+                dict(template["statistics"][0], lastAddedTimestamp=timestamp)
+                for timestamp in timestamps
+            ],
+        )
+
+    entries = [
+        entry(0, "2018-12-12T07:48:21.761Z"),
+        entry(1, "2018-12-12T07:48:21.760Z", "2018-12-10T00:00:00.000Z"),
+        entry(2, "2018-12-11T00:00:00.000Z"),
+        entry(3, "2018-12-10T00:00:00.000Z"),
+    ]
+
+    # Objects with any fact added before "before", most recent first
+    responses.add_callback(
+        responses.POST,
+        mock["url"],
+        callback=search_callback(
+            entries, lambda e: [s["lastAddedTimestamp"] for s in e["statistics"]]
+        ),
+    )
+
+    c = act.api.Act("http://localhost:8080", 1)
+
+    objects = list(c.iter_object_search(fact_type=["seenIn"], page_size=2))
+
+    # Object 1 matches all windows, but is only returned once
+    assert [obj.id for obj in objects] == ["0", "1", "2", "3"]
+
+    # Windows are advanced with the last fact added before the window
+    requests = [json.loads(call.request.body) for call in responses.calls]
+    assert [request.get("before") for request in requests] == [
+        None,
+        "2018-12-12T07:48:21.761Z",
+        "2018-12-11T00:00:00.001Z",
+        "2018-12-10T00:00:00.001Z",
+    ]
+
+    # Window can not be advanced when a page only has duplicates
+    entries[:] = [entry(i, "2018-12-12T07:48:21.761Z") for i in range(3)]
+    objects = list(c.iter_object_search(page_size=2))
+    assert [obj.id for obj in objects] == ["0", "1"]
@@ -162,3 +162,124 @@ def test_set_get():
 
     # The name should then be the same when we reference it from the data dictionary
     assert f.data["type"].data["name"] == "mentions"
+
+
+def test_field_index():
+    class Alias(Schema):
+        SCHEMA = [
+            Field("name"),
+            Field("type_name", deserialize_target="name", serializer=False),
+            Field("missing", deserialize_target="unknown"),
+            Field("items", serialize_target="entries"),
+        ]
+
+    assert Fact.get_field(Fact, "objects") is Fact.SCHEMA[4]
+    assert Fact.get_field(Fact, "bindings") is None
+
+    a = Alias(type_name="x", items=[1])
+
+    assert a.get_deserialize_field("type_name") is Alias.SCHEMA[0]
+    assert a.get_deserialize_field("missing") is None
+    assert a.get_serialize_field("name") is Alias.SCHEMA[0]
+    assert a.name == "x"
+    assert a.serialize() == {"name": "x", "entries": [1]}
+
+    # Each subclass has its own index
+    assert "objects" not in ObjectType._fields
+
+
+def test_key_translation():
+    class Entry(Schema):
+        SCHEMA = [
+            Field("validator_parameter"),
+            Field("in_reference_to", serialize_target="in_reference_to_id"),
+        ]
+
+    assert Entry._deserialize_keys["validatorParameter"] == "validator_parameter"
+    assert Entry._deserialize_keys["in_reference_to"] == "in_reference_to"
+
+    e = Entry(validatorParameter="x", in_reference_to="y")
+
+    assert e.validator_parameter == "x"
+    assert e.serialize() == {"validatorParameter": "x", "inReferenceToId": "y"}
+    assert e.serialize(to_camel_case=False) == {
+        "validator_parameter": "x",
+        "in_reference_to_id": "y",
+    }
+
+
+def test_compiled():
+    class Entry(Schema):
+        SCHEMA = [
+            Field("name"),
+            Field("type_name", deserialize_target="name", serializer=False),
+            Field("validator_parameter", default=""),
+            Field("type", deserializer=FactType),
+            Field(
+                "objects", default=[], serialize_target="bindings", deserializer=Object
+            ),
+            Field("ignored", deserializer=False),
+        ]
+
+    def generic(**entries):
+        e = Entry()
+        e.data = {}
+        e._deserialize_generic(**entries)
+        return e
+
+    for entries in [
+        {},
+        {"name": " x "},
+        {"name": "x", "validatorParameter": "y", "type": fact_test_data["type"]},
+        {"name": "x", "validator_parameter": None, "ignored": 1, "unknown": 2},
+        {"name": "x", "objects": [object_test_data], "types": [1, 2]},
+        {"typeName": "x", "validatorParameter": "y"},
+        {"validatorParameter": "x", "validator_parameter": "y"},
+    ]:
+        e = Entry(**entries)
+        g = generic(**entries)
+
+        assert e.data == g.data
+        assert e.serialize() == g.serialize() == e._serialize_generic()
+        assert e.serialize(False, False) == e._serialize_generic(False, False)
+        assert repr(e) == repr(g)
+
+    # Entries handled by the generic implementation are not modified
+    assert not Entry._deserialize_compiled(Entry(), {"typeName": "x"})
+    assert Entry._deserialize_compiled(Entry(), {"name": "x", "unknown": 1})
+
+    f = __test_data()
+    assert f.serialize() == f._serialize_generic()
+
+
+def test_attributes():
+    class Entry(Schema):
+        SCHEMA = [Field("name"), Field("serialize"), Field("nested", flatten=True)]
+
+    # Fields are properties on the class, except names already defined
+    assert isinstance(Entry.__dict__["name"], property)
+    assert "serialize" not in Entry.__dict__
+
+    e = Entry(name="x")
+    assert e.name == "x"
+
+    e.name = "y"
+    assert e.data["name"] == "y"
+
+    e.data["name"] = "z"
+    assert e.name == "z"
+
+    # Fields not in data
+    with pytest.raises(AttributeError):
+        # pylint: disable=pointless-statement
+        e.nested
+
+    e.data = {}
+    with pytest.raises(AttributeError):
+        # pylint: disable=pointless-statement
+        e.name
+
+    # Set on object, since the class has no __slots__
+    e.name = "x"
+    assert e.name == "x"
+    assert "name" not in e.data
@@ -0,0 +1,223 @@
+import datetime
+import json
+import threading
+import time
+
+import pytest
+import responses
+from act_test import get_mock_data
+
+import act.api
+from act.api.search import sharded_search, split_shard
+
+
+def test_split_shard():
+    start = datetime.datetime(2020, 1, 1)
+    end = datetime.datetime(2020, 1, 2)
+
+    shards = split_shard(start, end, 4)
+
+    # Most recent first, covering the full range
+    assert len(shards) == 4
+    assert shards[0][1] == end
+    assert shards[-1][0] == start
+    assert all(shards[i][0] == shards[i + 1][1] for i in range(3))
+
+    # Shards are not split below one millisecond
+    end = start + datetime.timedelta(milliseconds=2)
+    assert len(split_shard(start, end, 10)) == 2
+    assert len(split_shard(start, start + (end - start) / 2, 10)) == 1
+
+
+def search_data(n):
+    """Facts added every minute from 2020-01-01"""
+
+    start = datetime.datetime(2020, 1, 1)
+
+    return [
+        {
+            "id": str(i),
+            "timestamp": act.api.utils.format_timestamp(
+                start + datetime.timedelta(minutes=i)
+            ),
+        }
+        for i in range(n)
+    ]
+
+
+class ResultSet(list):
+    def __init__(self, data, size, count):
+        super().__init__(data)
+        self.size = size
+        self.count = count
+
+    @property
+    def complete(self):
+        return self.size >= self.count
+
+
+class Result(dict):
+    __getattr__ = dict.get
+
+
+def test_sharded_search():
+    data = search_data(1000)
+    lock = threading.Lock()
+    calls = []
+    active = [0, 0]  # active, max active
+
+    def search(after, before, limit):
+        with lock:
+            calls.append((after, before))
+            active[0] += 1
+            active[1] = max(active)
+
+        time.sleep(0.001)
+
+        # after and before are exclusive
+        matches = [d for d in data if after < d["timestamp"] < before]
+        page = [Result(d) for d in matches[-limit:]]
+
+        with lock:
+            active[0] -= 1
+
+        return ResultSet(page, len(page), len(matches))
+
+    results = list(
+        sharded_search(
+            search,
+            lambda result, before: result.timestamp,
+            "2020-01-01T00:00:00Z",
+            "2020-01-02T00:00:00Z",
+            workers=4,
+            limit=100,
+        )
+    )
+
+    # All results, most recent first, without duplicates
+    assert [result.id for result in results] == [str(i) for i in range(999, -1, -1)]
+
+    # Shards were split and searched concurrently
+    assert len(calls) > 10
+    assert 1 < active[1] <= 4
+
+    # Unordered results are the same facts
+    results = sharded_search(
+        search,
+        lambda result, before: result.timestamp,
+        "2020-01-01T00:00:00Z",
+        "2020-01-02T00:00:00Z",
+        workers=4,
+        limit=100,
+        ordered=False,
+    )
+    assert sorted(int(result.id) for result in results) == list(range(1000))
+
+    # Results in more than one shard are only returned once
+    search_shard = search
+
+    def search(after, before, limit):
+        result_set = search_shard(after, before, limit - 1)
+        result_set.append(Result(id="all", timestamp=None))
+        return result_set
+
+    results = sharded_search(
+        search,
+        lambda result, before: result.timestamp,
+        "2020-01-01T00:00:00Z",
+        "2020-01-02T00:00:00Z",
+        limit=100,
+        partition=False,
+    )
+    assert sorted(result.id for result in results) == sorted(
+        [d["id"] for d in data] + ["all"]
+    )
+
+
+def test_sharded_search_incomplete(caplog):
+    data = search_data(3) * 2  # More than limit results in same millisecond
+
+    def search(after, before, limit):
+        matches = [Result(d) for d in data if after < d["timestamp"] < before]
+        return ResultSet(matches[:limit], min(len(matches), limit), len(matches))
+
+    results = list(
+        sharded_search(
+            search,
+            lambda result, before: result.timestamp,
+            "2020-01-01T00:00:00Z",
+            "2020-01-01T00:00:01Z",
+            limit=1,
+        )
+    )
+
+    assert [result.id for result in results] == ["0"]
+    assert "not complete" in caplog.text
+
+
+@pytest.mark.filterwarnings("error::DeprecationWarning")
+def test_sharded_search_until_now():
+    calls = []
+
+    def search(after, before, limit):
+        calls.append(before)
+        return ResultSet([], 0, 0)
+
+    assert list(sharded_search(search, None, "2020-01-01T00:00:00Z")) == []
+
+    # Search is until now (UTC) if before is not specified
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    before = act.api.utils.parse_timestamp(calls[0])
+    assert datetime.timedelta(0) <= now - before < datetime.timedelta(minutes=1)
+
+
+@responses.activate
+def test_sharded_fact_search():
+    mock = get_mock_data("data/post_v1_fact_search_200.json")
+
+    entries = [
+        dict(mock["json"]["data"][0], id=entry["id"], timestamp=entry["timestamp"])
+        for entry in search_data(50)
+    ]
+
+    def callback(request):
+        params = json.loads(request.body)
+
+        matches = [
+            e for e in entries if params["after"] < e["timestamp"] < params["before"]
+        ]
+        page = matches[: params["limit"]]
+
+        return (
+            200,
+            {},
+            json.dumps(
+                {
+                    "responseCode": 200,
+                    "limit": params["limit"],
+                    "count": len(matches),
+                    "size": len(page),
+                    "data": page,
+                }
+            ),
+        )
+
+    responses.add_callback(responses.POST, mock["url"], callback=callback)
+
+    c = act.api.Act("http://localhost:8080", 1)
+
+    facts = list(
+        c.sharded_fact_search(
+            fact_type="seenIn",
+            after="2020-01-01T00:00:00Z",
+            before="2020-01-02T00:00:00Z",
+            page_size=10,
+            workers=2,
+        )
+    )
+
+    assert [fact.id for fact in facts] == [str(i) for i in range(49, -1, -1)]
+    assert all(fact.config is c.config for fact in facts)
+
+    with pytest.raises(act.api.base.ArgumentError):
+        c.sharded_fact_search(after="2020-01-01T00:00:00Z", limit=10)
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+import responses
+from act_test import get_mock_data
+
+import act.api
+from act.api.stream import ARRAY_START, ITEM, KEY, IncompleteJSON, iter_json_object
+
+RESPONSE = {
+    "responseCode": 200,
+    "limit": 3,
+    "count": 12345678901234,
+    "messages": None,
+    "data": [
+        {"id": 1, "value": "æøå ☃", "nested": {"list": [1, 2.5, None, True]}},
+        {"id": 2, "value": "with \"quotes\" and \\ escapes ]}"},
+        12345,
+    ],
+    "size": 3,
+}
+
+
+def chunked(text, size):
+    data = text.encode("utf-8")
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+def test_iter_json_object(size):
+    for indent in (None, 2):
+        events = list(iter_json_object(chunked(json.dumps(RESPONSE, indent=indent), size)))
+
+        assert events == [
+            (KEY, "responseCode", 200),
+            (KEY, "limit", 3),
+            (KEY, "count", 12345678901234),
+            (KEY, "messages", None),
+            (ARRAY_START, "data", None),
+            (ITEM, "data", RESPONSE["data"][0]),
+            (ITEM, "data", RESPONSE["data"][1]),
+            (ITEM, "data", 12345),
+            (KEY, "size", 3),
+        ]
+
+
+def test_iter_json_object_empty():
+    assert list(iter_json_object([b"{}"])) == []
+    assert list(iter_json_object([b'{"data": [], "size": 0}'])) == [
+        (ARRAY_START, "data", None),
+        (KEY, "size", 0),
+    ]
+    assert list(iter_json_object([b'{"data": null}'])) == [(KEY, "data", None)]
+
+
+def test_iter_json_object_invalid():
+    with pytest.raises(IncompleteJSON):
+        list(iter_json_object(chunked('{"data": [{"id": 1}, ', 4)))
+
+    with pytest.raises(ValueError):
+        list(iter_json_object([b'{"data": [{"id": 1}, {"id": ']))
+
+    with pytest.raises(ValueError):
+        list(iter_json_object([b"[1, 2]"]))
+
+
+@responses.activate
+def test_fact_search_stream():
+    mock = get_mock_data("data/post_v1_fact_search_200.json")
+    responses.add(
+        responses.POST, mock["url"], json=mock["json"], status=mock["status_code"]
+    )
+
+    c = act.api.Act("http://localhost:8080", 1)
+
+    with c.fact_search(fact_type=["seenIn"], limit=1, stream=True) as facts:
+        assert isinstance(facts, act.api.base.StreamingResultSet)
+
+        # Metadata before data is available before iterating
+        assert facts.count == mock["json"]["count"]
+        assert facts.limit == 1
+
+        result = list(facts)
+
+    assert facts.size == 1
+    assert not facts.complete
+
+    assert result == list(c.fact_search(fact_type=["seenIn"], limit=1))
+    assert all(fact.config is c.config for fact in result)
+
+    # Stream is not sent as a parameter to the API
+    assert b"stream" not in responses.calls[0].request.body
+
+
+@pytest.mark.parametrize(
+    "body", ["<html>Bad gateway</html>", '{"count": 1, "limit": 1, "da', "[]"]
+)
+@responses.activate
+def test_fact_search_stream_invalid(body, monkeypatch):
+    responses.add(
+        responses.POST, "http://localhost:8080/v1/fact/search", body=body, status=200
+    )
+
+    closed = []
+    monkeypatch.setattr(
+        act.api.base.StreamingResultSet, "close", lambda self: closed.append(self)
+    )
+
+    c = act.api.Act("http://localhost:8080", 1)
+
+    # Invalid JSON before the entries is reported as ResponseError, and the
+    # response is closed
+    with pytest.raises(act.api.base.ResponseError):
+        c.fact_search(fact_type=["seenIn"], stream=True)
+
+    assert len(closed) == 1
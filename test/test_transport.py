@@ -0,0 +1,489 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+import responses
+from act_test import get_mock_data
+
+import act.api
+from act.api.transport import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    CircuitBreaker,
+    RateLimiter,
+    ResponseCache,
+    RetryPolicy,
+    SingleFlight,
+    TokenBucket,
+    normalize_params,
+)
+
+SERVICE_TIMEOUT = {
+    "responseCode": 503,
+    "limit": 0,
+    "count": 0,
+    "messages": [
+        {
+            "type": "ActionError",
+            "message": "Request timed out, service may be overloaded or unavailable.",
+            "messageTemplate": "service.timeout",
+            "field": None,
+            "parameter": None,
+            "timestamp": "2022-10-11T11:41:32.238Z",
+        }
+    ],
+    "data": None,
+    "size": 0,
+}
+
+
+def test_retry_backoff():
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+
+    assert [policy.backoff(retry) for retry in range(5)] == [1, 2, 4, 5, 5]
+
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5)
+    assert all(0 <= policy.backoff(retry) <= 5 for retry in range(10))
+
+
+def test_retry_budget():
+    policy = RetryPolicy(max_retries=10, budget=2, budget_ratio=0.5)
+
+    assert policy.acquire(0)
+    assert policy.acquire(1)
+
+    # Budget is exhausted
+    assert not policy.acquire(2)
+    assert policy.budget_exhausted == 1
+
+    # Two requests sent adds one retry to the budget
+    policy.request_sent()
+    policy.request_sent()
+    assert policy.acquire(2)
+
+    # Never exceed max retries per request
+    assert not RetryPolicy(max_retries=1).acquire(1)
+
+
+@responses.activate
+def test_retry_service_timeout():
+    mock = get_mock_data("data/get_v1_factType_200.json")
+    responses.add(responses.GET, mock["url"], json=SERVICE_TIMEOUT, status=503)
+    responses.add(
+        responses.GET, mock["url"], json=mock["json"], status=mock["status_code"]
+    )
+
+    policy = RetryPolicy(backoff_factor=0)
+    c = act.api.Act("http://localhost:8080", 1, retry_policy=policy)
+
+    assert len(c.get_fact_types()) == 2
+    assert len(responses.calls) == 2
+    assert policy.last_call.retries == 1
+    assert policy.retries == 1
+
+
+@responses.activate
+def test_retry_gives_up():
+    mock = get_mock_data("data/get_v1_factType_200.json")
+    responses.add(responses.GET, mock["url"], json=SERVICE_TIMEOUT, status=503)
+
+    policy = RetryPolicy(max_retries=2, backoff_factor=0)
+    c = act.api.Act("http://localhost:8080", 1, retry_policy=policy)
+
+    with pytest.raises(act.api.base.ServiceTimeout):
+        c.get_fact_types()
+
+    assert len(responses.calls) == 3
+    assert policy.last_call.retries == 2
+
+
+@responses.activate
+def test_no_retry_on_validation_error():
+    mock = get_mock_data("data/post_v1_fact_127.0.0.x_412.json")
+    responses.add(
+        responses.POST, mock["url"], json=mock["json"], status=mock["status_code"]
+    )
+
+    c = act.api.Act(
+        "http://localhost:8888", 1, retry_policy=RetryPolicy(backoff_factor=0)
+    )
+
+    with pytest.raises(act.api.base.ValidationError):
+        c.fact("mentions", "ipv4").source("report", "xyz").destination(
+            "ipv4", "127.0.0.x"
+        ).add()
+
+    assert len(responses.calls) == 1
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+
+    # Burst is available immediately
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+
+    # Next tokens must be waited for
+    assert 0.05 < bucket.reserve() <= 0.1
+    assert 0.15 < bucket.reserve() <= 0.2
+
+
+def test_rate_limiter_endpoints():
+    limiter = RateLimiter(
+        endpoints={"v1/fact": 100, "v1/fact/search": (100, 5), "v1/fact/uuid/*/meta": 1}
+    )
+
+    assert limiter.endpoint("http://localhost:8080/v1/fact") == "v1/fact"
+    assert limiter.endpoint("http://localhost:8080/v1/fact/search") == "v1/fact/search"
+    assert (
+        limiter.endpoint("http://localhost/act/v1/fact/uuid/abc/meta")
+        == "v1/fact/uuid/*/meta"
+    )
+    assert limiter.endpoint("http://localhost:8080/v1/factType") is None
+
+
+@responses.activate
+def test_rate_limiter():
+    mock = get_mock_data("data/get_v1_factType_200.json")
+    responses.add(
+        responses.GET, mock["url"], json=mock["json"], status=mock["status_code"]
+    )
+
+    limiter = RateLimiter(rate=50, burst=1)
+    c = act.api.Act("http://localhost:8080", 1, rate_limiter=limiter)
+
+    for _ in range(3):
+        c.get_fact_types()
+
+    assert limiter.requests == 3
+    assert limiter.wait_time > 0.02
+    assert limiter.last_wait > 0
+
+
+def test_circuit_breaker_states():
+    breaker = CircuitBreaker(
+        failure_threshold=2, recovery_timeout=0.05, half_open_max_calls=2
+    )
+
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED
+
+    # Success resets the failure count
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+    time.sleep(0.06)
+    assert breaker.state == CIRCUIT_HALF_OPEN
+
+    # Limited number of probes
+    assert breaker.allow()
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CIRCUIT_CLOSED
+
+    # Failing probe opens the circuit again
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CIRCUIT_OPEN
+    assert breaker.times_opened == 3
+
+
+@responses.activate
+def test_circuit_breaker():
+    mock = get_mock_data("data/get_v1_factType_200.json")
+    responses.add(responses.GET, mock["url"], json=SERVICE_TIMEOUT, status=503)
+
+    c = act.api.Act(
+        "http://localhost:8080",
+        1,
+        retry_policy=RetryPolicy(max_retries=5, backoff_factor=0),
+        circuit_breaker=CircuitBreaker(failure_threshold=2),
+    )
+
+    assert c.circuit_state == CIRCUIT_CLOSED
+
+    # Retries are stopped when the circuit opens
+    with pytest.raises(act.api.base.CircuitOpen):
+        c.get_fact_types()
+
+    assert len(responses.calls) == 2
+    assert c.circuit_state == CIRCUIT_OPEN
+
+    with pytest.raises(act.api.base.CircuitOpen):
+        c.get_fact_types()
+
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_circuit_breaker_timeout():
+    mock = get_mock_data("data/get_v1_factType_200.json")
+    responses.add(
+        responses.GET, mock["url"], body=requests.exceptions.ReadTimeout("timeout")
+    )
+
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    c = act.api.Act("http://localhost:8080", 1, circuit_breaker=breaker)
+
+    # Timeouts are failures
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            c.get_fact_types()
+
+    assert breaker.failures == 2
+    assert c.circuit_state == CIRCUIT_OPEN
+
+    # A probe that times out opens the circuit again
+    time.sleep(0.06)
+    assert c.circuit_state == CIRCUIT_HALF_OPEN
+
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        c.get_fact_types()
+
+    assert c.circuit_state == CIRCUIT_OPEN
+    assert breaker.times_opened == 2
+
+    # 5xx responses (e.g. from a proxy) are failures, 404 is neither a
+    # success nor a failure
+    responses.replace(responses.GET, mock["url"], body="Bad gateway", status=502)
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    c = act.api.Act("http://localhost:8080", 1, circuit_breaker=breaker)
+
+    with pytest.raises(act.api.base.ServerError):
+        c.get_fact_types()
+
+    assert breaker.failures == 1
+
+    responses.replace(responses.GET, mock["url"], body="Not found", status=404)
+
+    with pytest.raises(act.api.base.ResponseError):
+        c.get_fact_types()
+
+    assert breaker.failures == 1
+
+    # Validation errors are successes
+    responses.replace(
+        responses.GET,
+        mock["url"],
+        json=get_mock_data("data/post_v1_fact_127.0.0.x_412.json")["json"],
+        status=412,
+    )
+
+    with pytest.raises(act.api.base.ValidationError):
+        c.get_fact_types()
+
+    assert breaker.failures == 0
+
+
+def test_single_flight():
+    flight = SingleFlight()
+    release = threading.Event()
+    results = []
+
+    def slow():
+        release.wait(5)
+        return object()
+
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("key", slow)))
+        for _ in range(5)
+    ]
+
+    for thread in threads:
+        thread.start()
+
+    # Wait until all threads have joined the call in flight
+    deadline = time.monotonic() + 5
+    while flight.coalesced < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    release.set()
+
+    for thread in threads:
+        thread.join()
+
+    assert flight.calls == 1
+    assert flight.coalesced == 4
+    assert len(results) == 5
+    assert all(result is results[0] for result in results)
+
+    # Completed calls are not cached
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.calls == 2
+
+    # Errors are raised
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: int("x"))
+    assert not flight._inflight
+
+
+@responses.activate
+def test_single_flight_requests():
+    mock = get_mock_data("data/get_v1_factType_200.json")
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def callback(request):
+        release.wait(5)
+        return (200, {}, json.dumps(mock["json"]))
+
+    responses.add_callback(responses.GET, mock["url"], callback=callback)
+
+    c = act.api.Act("http://localhost:8080", 1, single_flight=flight)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(c.get_fact_types()))
+        for _ in range(4)
+    ]
+
+    for thread in threads:
+        thread.start()
+
+    deadline = time.monotonic() + 5
+    while flight.coalesced < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    release.set()
+
+    for thread in threads:
+        thread.join()
+
+    assert len(responses.calls) == 1
+    assert flight.coalesced == 3
+    assert all(result.data == results[0].data for result in results)
+    assert results[0] is not results[1]
+
+
+def test_normalize_params():
+    # List order, case style and empty values do not matter
+    assert normalize_params(
+        {"fact_type": ["seenIn", "mentions"], "objectValue": ["x"], "limit": None}
+    ) == normalize_params({"factType": ["mentions", "seenIn"], "object_value": ["x"]})
+
+    assert normalize_params({"limit": 10}) != normalize_params({"limit": 25})
+
+
+def test_response_cache(monkeypatch):
+    codec = act.api.codec.get_codec()
+    cache = ResponseCache(ttl=10, max_entries=2, max_bytes=100)
+    url = "http://localhost:8080/v1/fact/search"
+    now = [1000.0]
+
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+
+    assert cache.cacheable("POST", url)
+    assert not cache.cacheable("GET", url)
+    assert not cache.cacheable("POST", "http://localhost:8080/v1/fact")
+    assert cache.cacheable("POST", "http://localhost:8080/v1/object/uuid/x/traverse")
+
+    key = cache.key("POST", url, 1, json={"factType": ["a", "b"]})
+    assert key == cache.key("POST", url, 1, json={"fact_type": ["b", "a"]})
+    assert key != cache.key("POST", url, 2, json={"factType": ["a", "b"]})
+
+    # Hits return a copy of the response
+    response = {"data": [1]}
+    assert cache.fetch(key, lambda: response, codec) is response
+    hit = cache.fetch(key, lambda: None, codec)
+    assert hit == response and hit is not response
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+    # Expired after ttl
+    now[0] += 10
+    assert cache.get(key, codec) is None
+    assert cache.stats.entries == 0
+
+    # Least recently used are evicted by max_entries
+    for i in range(3):
+        cache.put(("key", str(i)), {"data": [i]}, codec)
+        cache.get(("key", "0"), codec)
+    assert cache.get(("key", "1"), codec) is None
+    assert cache.get(("key", "0"), codec) == {"data": [0]}
+    assert cache.stats.evictions == 1
+
+    # and max_bytes
+    cache.put(("key", "3"), {"data": ["x" * 80]}, codec)
+    assert cache.stats.entries == 1
+    assert cache.bytes <= 100
+    cache.put(("key", "4"), {"data": ["x" * 100]}, codec)
+    assert cache.get(("key", "4"), codec) is None
+
+    # Invalidate by endpoint
+    cache.put(cache.key("POST", url, 1), {}, codec)
+    assert cache.invalidate("v1/object/search") == 0
+    assert cache.invalidate("v1/fact/search") == 1
+    assert cache.invalidate() == 1
+    assert cache.stats.entries == 0
+    assert cache.stats.bytes == 0
+
+
+@responses.activate
+def test_response_cache_requests():
+    search = get_mock_data("data/post_v1_fact_search_200.json")
+    fact = get_mock_data("data/post_v1_fact_127.0.0.1_201.json")
+    fact_types = get_mock_data("data/get_v1_factType_200.json")
+
+    for method, mock in (
+        (responses.POST, search),
+        (responses.POST, fact),
+        (responses.GET, fact_types),
+    ):
+        responses.add(
+            method, mock["url"], json=mock["json"], status=mock["status_code"]
+        )
+
+    c = act.api.Act("http://localhost:8080", 1, response_cache=ResponseCache())
+
+    facts = c.fact_search(fact_type=["seenIn", "mentions"], object_value="127.0.0.1")
+    cached = c.fact_search(fact_type=["mentions", "seenIn"], object_value=["127.0.0.1"])
+    assert cached.data == facts.data
+    assert len(responses.calls) == 1
+
+    c.get_fact_types()
+    c.get_fact_types()
+    assert len(responses.calls) == 2
+    assert c.cache_stats.hits == 2
+    assert c.cache_stats.misses == 2
+
+    # Adding a fact invalidates searches, but not type lookups
+    c.fact("seenIn", "report").source("ipv4", "127.0.0.1").destination(
+        "report", "xyz"
+    ).add()
+    assert c.cache_stats.invalidations == 1
+
+    c.fact_search(fact_type=["seenIn", "mentions"], object_value="127.0.0.1")
+    c.get_fact_types()
+    assert len(responses.calls) == 4
+
+    assert c.invalidate_cache() == 2
+
+    # Writes do not invalidate, unless invalidate_on_write
+    c = act.api.Act(
+        "http://localhost:8080",
+        1,
+        response_cache=ResponseCache(invalidate_on_write=False),
+    )
+    c.fact_search(fact_type="seenIn")
+    c.fact("seenIn", "report").source("ipv4", "127.0.0.1").destination(
+        "report", "xyz"
+    ).add()
+    c.fact_search(fact_type="seenIn")
+    assert c.cache_stats.invalidations == 0
+    assert c.cache_stats.hits == 1